@@ -1,72 +1,216 @@
 import os
-import requests
 import json
-from typing import Dict, Any
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+import httpx
 
 # Configuration for Local AI (Ollama)
 OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")  # Default to mistral, can be llama3, etc.
+# Generations sent to Ollama at once; further summaries wait for a slot
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+# Local AI can be slow on first load, so allow up to 5 minutes
+OLLAMA_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "300"))
+# Finished summaries kept in memory, keyed by model and prompt hash
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "256"))
 
-def generate_summary(analysis_data: Dict[str, Any]) -> str:
-    """
-    Generate a natural language summary of the codebase analysis using Local AI (Ollama).
-    """
-    try:
-        # Construct a prompt from the analysis data
-        summary_stats = analysis_data.get("summary", {})
-        files = analysis_data.get("files", [])
-        
-        # Get high risk files
-        high_risk_files = sorted(files, key=lambda x: x.get("risk_score", 0), reverse=True)[:3]
-        
-        # Get key classes/functions (just a sample)
-        functions = analysis_data.get("functions", [])
-        classes = [f["name"] for f in functions if f.get("type") == "class"]
-        
-        prompt = f"""
+
+class OllamaError(Exception):
+    """Raised when Ollama answers with an error."""
+
+
+def build_prompt(analysis_data: Dict[str, Any]) -> str:
+    """Construct the summary prompt from the analysis data."""
+    summary_stats = analysis_data.get("summary", {})
+    files = analysis_data.get("files", [])
+
+    # Get high risk files
+    high_risk_files = sorted(files, key=lambda x: x.get("risk_score", 0), reverse=True)[:3]
+
+    # Get key classes/functions (just a sample)
+    functions = analysis_data.get("functions", [])
+    classes = [f["name"] for f in functions if f.get("type") == "class"]
+
+    return f"""
         You are an expert Senior Software Architect. I have analyzed a legacy codebase and need you to provide a professional executive summary.
-        
+
         Here is the data I extracted:
-        
+
         **Project Stats:**
         - Total Files: {summary_stats.get('total_files')}
         - Total Functions/Methods: {summary_stats.get('total_functions')}
         - Total Lines of Code: {summary_stats.get('total_loc')}
-        
+
         **Key Components (Classes):**
         {', '.join(classes[:10])}
-        
+
         **Top 3 High-Risk Files (Complex & Heavily Used):**
         {', '.join([f"{f['path']} (Risk Score: {f.get('risk_score')})" for f in high_risk_files])}
-        
+
         **Task:**
         Write a concise but insightful summary of this codebase.
         1. **Overview:** What does this project likely do based on the class names?
         2. **Architecture:** Describe the structure (e.g., is it a simple script, a web app, a data processing tool?).
         3. **Risk Assessment:** Comment on the high-risk files and why they might be critical.
         4. **Recommendations:** Give 1-2 quick tips for refactoring or maintenance.
-        
+
         Keep the tone professional and constructive. Format with Markdown.
         """
-        
-        # Payload for Ollama
+
+
+class Generation:
+    """
+    One summary as it is being generated.
+
+    Any number of requests can follow the same generation; each one replays
+    the text produced so far and then waits for more.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    async def append(self, chunk: str):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def stream(self) -> AsyncIterator[str]:
+        """Yield every chunk of the summary, as soon as it is produced."""
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done or position < len(self.chunks))
+                chunks = self.chunks[position:]
+                done = self.done
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if done and position == len(self.chunks):
+                return
+
+    async def text(self) -> str:
+        """Wait for the whole summary."""
+        return "".join([chunk async for chunk in self.stream()])
+
+
+class SummaryService:
+    """
+    Generate summaries with a pooled async connection to Ollama.
+
+    At most ``max_concurrency`` generations run at once. Finished summaries
+    are cached by model and prompt hash, and concurrent requests for the
+    same repo_id share one upstream generation.
+    """
+
+    def __init__(
+        self,
+        api_url: str = OLLAMA_API_URL,
+        model: str = OLLAMA_MODEL,
+        max_concurrency: int = OLLAMA_MAX_CONCURRENCY,
+        cache_size: int = SUMMARY_CACHE_SIZE,
+        timeout: float = OLLAMA_TIMEOUT_SECONDS
+    ):
+        self.api_url = api_url
+        self.model = model
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.cache: "OrderedDict[str, str]" = OrderedDict()
+        # repo_id -> generation in progress
+        self.in_flight: Dict[str, Generation] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+        self._tasks = set()
+
+    def cache_key(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{self.model}:{digest}"
+
+    def summarize(self, repo_id: str, analysis_data: Dict[str, Any]) -> Generation:
+        """Start (or join) the summary of an analysis; must be called on the event loop."""
+        generation = self.in_flight.get(repo_id)
+        if generation is not None:
+            return generation
+
+        generation = Generation()
+        prompt = build_prompt(analysis_data)
+        key = self.cache_key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            generation.chunks.append(cached)
+            generation.done = True
+            return generation
+
+        self.in_flight[repo_id] = generation
+        task = asyncio.create_task(self._run(repo_id, key, prompt, generation))
+        # Keep a reference so the task is not garbage collected if every reader disconnects
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return generation
+
+    async def _run(self, repo_id: str, key: str, prompt: str, generation: Generation):
+        try:
+            async with self.semaphore:
+                print(f"Sending request to Ollama ({self.model})...")
+                async for chunk in self._generate(prompt):
+                    await generation.append(chunk)
+            if not generation.chunks:
+                await generation.append("No response generated.")
+            else:
+                self.cache[key] = "".join(generation.chunks)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        except httpx.ConnectError:
+            await generation.append(
+                "Error: Could not connect to Ollama. Make sure Ollama is running locally (http://localhost:11434)."
+            )
+        except OllamaError as e:
+            await generation.append(str(e))
+        except Exception as e:
+            await generation.append(f"Error generating summary: {str(e)}")
+        finally:
+            self.in_flight.pop(repo_id, None)
+            await generation.finish()
+
+    async def _generate(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the tokens Ollama generates for a prompt."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=self.timeout)
+
         payload = {
-            "model": OLLAMA_MODEL,
+            "model": self.model,
             "prompt": prompt,
-            "stream": False
+            "stream": True
         }
-        
-        print(f"Sending request to Ollama ({OLLAMA_MODEL})...")
-        # Increased timeout to 300s (5 min) as local AI can be slow on first load
-        response = requests.post(OLLAMA_API_URL, json=payload, timeout=300)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("response", "No response generated.")
-        else:
-            return f"Error from Local AI: {response.status_code} - {response.text}"
-            
-    except requests.exceptions.ConnectionError:
-        return "Error: Could not connect to Ollama. Make sure Ollama is running locally (http://localhost:11434)."
-    except Exception as e:
-        return f"Error generating summary: {str(e)}"
+        async with self.client.stream("POST", self.api_url, json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                raise OllamaError(f"Error from Local AI: {response.status_code} - {body}")
+
+            # Ollama streams one JSON object per line
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise OllamaError(f"Error from Local AI: {data['error']}")
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+
+    async def close(self):
+        """Close the pooled connection."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
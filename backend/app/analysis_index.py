@@ -0,0 +1,96 @@
+"""Per-analysis indexes for paginated, filtered and sorted file queries."""
+
+from bisect import bisect_left
+from typing import Dict, List, Any, Optional, Tuple
+
+
+SORT_KEYS = ("risk_score", "loc", "imported_by_count", "pagerank", "transitive_fan_in")
+
+
+class AnalysisIndex:
+    """
+    File orderings and filter sets built once per analysis.
+
+    Pages of files are answered by slicing a presorted order instead of
+    sorting and filtering the full file list on every request.
+    """
+
+    def __init__(self, files: List[Dict[str, Any]]):
+        self.files = files
+        # sort key -> file positions, highest value first (ties by path)
+        self.orders: Dict[str, List[int]] = {}
+        # sort key -> position -> rank in that order
+        self.ranks: Dict[str, List[int]] = {}
+        for key in SORT_KEYS:
+            order = sorted(
+                range(len(files)),
+                key=lambda i: (-files[i].get(key, 0), files[i]["path"])
+            )
+            rank = [0] * len(files)
+            for position, file_index in enumerate(order):
+                rank[file_index] = position
+            self.orders[key] = order
+            self.ranks[key] = rank
+
+        self.by_language: Dict[str, set] = {}
+        self.by_risk_level: Dict[str, set] = {}
+        for i, file_data in enumerate(files):
+            self.by_language.setdefault(file_data.get("language"), set()).add(i)
+            self.by_risk_level.setdefault(file_data.get("risk_level"), set()).add(i)
+
+        # (path, position) sorted by path, for prefix range lookups
+        self.paths = sorted((file_data["path"], i) for i, file_data in enumerate(files))
+
+    def _with_prefix(self, path_prefix: str) -> set:
+        start = bisect_left(self.paths, (path_prefix,))
+        matches = set()
+        for path, i in self.paths[start:]:
+            if not path.startswith(path_prefix):
+                break
+            matches.add(i)
+        return matches
+
+    def query(
+        self,
+        sort: Optional[str] = None,
+        descending: bool = True,
+        language: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Get one page of files.
+
+        Returns:
+            Total number of matching files and the files of the requested page.
+        """
+        candidates = None
+        for matches in (
+            self.by_language.get(language, set()) if language else None,
+            self.by_risk_level.get(risk_level.upper(), set()) if risk_level else None,
+            self._with_prefix(path_prefix) if path_prefix else None,
+        ):
+            if matches is not None:
+                candidates = matches if candidates is None else candidates & matches
+
+        reverse = sort is not None and not descending
+        order = range(len(self.files)) if sort is None else self.orders[sort]
+        end = None if limit is None else offset + limit
+
+        if candidates is None:
+            total = len(order)
+            if reverse:
+                # Slice from the tail so ascending pages do not copy the whole order
+                stop = max(total - offset, 0)
+                start = 0 if limit is None else max(stop - limit, 0)
+                page = order[start:stop][::-1]
+            else:
+                page = order[offset:end]
+        else:
+            total = len(candidates)
+            rank = None if sort is None else self.ranks[sort].__getitem__
+            page = sorted(candidates, key=rank, reverse=reverse)[offset:end]
+
+        return total, [self.files[i] for i in page]
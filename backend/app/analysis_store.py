@@ -0,0 +1,610 @@
+"""
+Bounded in-memory store of analysis results over a persistent backend.
+
+The default backend is a SQLite database in WAL mode that every worker
+process on a host shares, so an analysis uploaded through one uvicorn worker
+can be read through any other, and analyses survive restarts.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from .function_table import FunctionTable
+from .utils import DATA_DIR
+
+
+# Memory budget for cached analyses; 0 means unbounded
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Seconds an analysis stays in memory without being used; 0 disables expiry
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "0"))
+# Where analyses are persisted: "sqlite" (shared by every worker process, survives
+# restarts) or "files" (evicted analyses spilled to JSON files, single process only)
+ANALYSIS_STORE_BACKEND = os.getenv("ANALYSIS_STORE_BACKEND", "sqlite")
+# SQLite database of the sqlite backend
+ANALYSIS_STORE_PATH = os.getenv("ANALYSIS_STORE_PATH", os.path.join(DATA_DIR, "analyses.sqlite3"))
+# Where the files backend writes evicted analyses so they can be loaded back on demand
+ANALYSIS_SPILL_DIR = os.getenv("ANALYSIS_SPILL_DIR", os.path.join(DATA_DIR, "analyses"))
+# Disk budget for stored analyses with their indexes and source content; 0 means unbounded
+ANALYSIS_STORE_MAX_BYTES = int(os.getenv("ANALYSIS_STORE_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+# Seconds a stored analysis is kept without being used; 0 keeps it until the budget needs room
+ANALYSIS_STORE_TTL_SECONDS = int(os.getenv("ANALYSIS_STORE_TTL_SECONDS", "0"))
+# Least seconds between two writes of an analysis' last use to the backend
+ANALYSIS_TOUCH_INTERVAL_SECONDS = 60
+
+
+def estimate_analysis_size(results: Dict[str, Any]) -> int:
+    """
+    Approximate the memory held by an analysis.
+
+    Source content dominates; every file, function and edge record adds a
+    roughly fixed dict overhead on top of it.
+    """
+    files = results.get("files", [])
+    size = sum(len(file_data.get("content", "")) for file_data in files)
+    size += 1000 * len(files)
+    functions = results.get("functions", [])
+    size += (80 if isinstance(functions, FunctionTable) else 600) * len(functions)
+    size += 200 * len(results.get("dependency_graph", {}).get("edges", []))
+    return size
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, FunctionTable):
+        return value.to_list()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_analysis(results: Dict[str, Any]) -> str:
+    """Serialize an analysis (or index) to JSON."""
+    return json.dumps(results, default=_to_json)
+
+
+def load_analysis(data: str) -> Dict[str, Any]:
+    """Deserialize an analysis written by dump_analysis."""
+    results = json.loads(data)
+    if "functions" in results:
+        results["functions"] = FunctionTable.from_list(results["functions"])
+    return results
+
+
+class FileBackend:
+    """
+    Analyses spilled to one JSON file each.
+
+    Only analyses evicted from memory are written, so this backend is not
+    shared between processes: archive hashes and jobs stay in this process.
+    Indexes are written next to the analyses.
+    """
+
+    # Analyses are only written once they are evicted from memory
+    write_through = False
+
+    def __init__(self, spill_dir: str = ANALYSIS_SPILL_DIR):
+        self.spill_dir = spill_dir
+        self.archives: Dict[str, str] = {}
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def _path(self, repo_id: str, kind: str = "analysis") -> str:
+        # repo_ids are generated UUIDs; never let one escape the spill directory
+        name = os.path.basename(repo_id)
+        if kind != "analysis":
+            name = f"{name}.{os.path.basename(kind)}"
+        return os.path.join(self.spill_dir, f"{name}.json")
+
+    def save(self, repo_id: str, results: Dict[str, Any]) -> int:
+        path = self._path(repo_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, default=_to_json)
+        os.replace(temp_path, path)
+        return time.time_ns()
+
+    def load(self, repo_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        try:
+            with open(self._path(repo_id), 'r', encoding='utf-8') as f:
+                return load_analysis(f.read()), os.fstat(f.fileno()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def version(self, repo_id: str) -> Optional[int]:
+        try:
+            return os.stat(self._path(repo_id)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def touch(self, repo_id: str):
+        # The access time records the last use; the modification time is the version
+        try:
+            os.utime(self._path(repo_id), ns=(time.time_ns(), os.stat(self._path(repo_id)).st_mtime_ns))
+        except FileNotFoundError:
+            pass
+
+    def usage(self) -> List[Tuple[str, int, float]]:
+        sizes: Dict[str, int] = {}
+        last_used: Dict[str, float] = {}
+        for entry in os.scandir(self.spill_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            repo_id = entry.name.split(".", 1)[0]
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            sizes[repo_id] = sizes.get(repo_id, 0) + stat.st_size
+            if entry.name == f"{repo_id}.json":
+                last_used[repo_id] = max(stat.st_atime, stat.st_mtime)
+        return [(repo_id, sizes[repo_id], used) for repo_id, used in last_used.items()]
+
+    def delete(self, repo_id: str):
+        for kind in ["analysis"] + self._index_kinds(repo_id):
+            try:
+                os.unlink(self._path(repo_id, kind))
+            except FileNotFoundError:
+                pass
+        for content_hash in [h for h, r in self.archives.items() if r == repo_id]:
+            del self.archives[content_hash]
+
+    def _index_kinds(self, repo_id: str) -> List[str]:
+        prefix = f"{os.path.basename(repo_id)}."
+        return [
+            name[len(prefix):-len(".json")] for name in os.listdir(self.spill_dir)
+            if name.startswith(prefix) and name.endswith(".json") and len(name) > len(prefix) + len(".json")
+        ]
+
+    def save_index(self, repo_id: str, kind: str, index: Dict[str, Any]):
+        path = self._path(repo_id, kind)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, path)
+
+    def load_index(self, repo_id: str, kind: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(repo_id, kind), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def set_archive(self, content_hash: str, repo_id: str):
+        self.archives[content_hash] = repo_id
+
+    def get_archive(self, content_hash: str) -> Optional[str]:
+        return self.archives.get(content_hash)
+
+    def save_job(self, job: Dict[str, Any]):
+        pass
+
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def request_cancel(self, job_id: str):
+        pass
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return False
+
+    def prune_jobs(self, finished_before: float):
+        pass
+
+
+class SQLiteBackend:
+    """
+    Analyses, their indexes, archive hashes and job states in one SQLite
+    database in WAL mode.
+
+    Any number of processes can open the same database: readers never block
+    each other or the writer, so every worker serves every analysis. Within a
+    process, writes share one connection and every thread reads through its
+    own, so a lookup does not wait for a large analysis being written.
+    Each analysis carries a version that changes whenever it is written,
+    letting workers notice that their in-memory copy is stale.
+    """
+
+    # Analyses are written as soon as they are cached
+    write_through = True
+
+    def __init__(self, path: str = ANALYSIS_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Serializes writes on the shared connection
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        has_usage = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage'"
+        ).fetchone() is not None
+        # Each analysis' version precedes its (large) value, so checking it does not read the value
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "repo_id TEXT PRIMARY KEY, version INTEGER NOT NULL, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS indexes ("
+            "repo_id TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (repo_id, kind));"
+            "CREATE TABLE IF NOT EXISTS archives ("
+            "content_hash TEXT PRIMARY KEY, repo_id TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, value TEXT NOT NULL, finished_at REAL, "
+            "cancel_requested INTEGER NOT NULL DEFAULT 0);"
+            # Bytes stored and last use of each analysis, for pruning
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "repo_id TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS usage_last_used ON usage (last_used);"
+        )
+        if not has_usage:
+            # Analyses stored before sizes were tracked
+            self.connection.execute(
+                "INSERT OR IGNORE INTO usage (repo_id, size, last_used) "
+                "SELECT repo_id, length(CAST(value AS BLOB)), version / 1e9 FROM analyses"
+            )
+        self.connection.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        """The calling thread's read connection."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self.local.connection = connection
+        return connection
+
+    def save(self, repo_id: str, results: Dict[str, Any]) -> int:
+        value = dump_analysis(results)
+        version = time.time_ns()
+        with self.lock:
+            # Indexes of an older analysis under this id are now stale
+            self.connection.execute("DELETE FROM indexes WHERE repo_id = ?", (repo_id,))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO analyses (repo_id, version, value) VALUES (?, ?, ?)",
+                (repo_id, version, value),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO usage (repo_id, size, last_used) VALUES (?, ?, ?)",
+                (repo_id, len(value), time.time()),
+            )
+            self.connection.commit()
+        return version
+
+    def load(self, repo_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        row = self._reader().execute(
+            "SELECT value, version FROM analyses WHERE repo_id = ?", (repo_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return load_analysis(row[0]), row[1]
+
+    def version(self, repo_id: str) -> Optional[int]:
+        row = self._reader().execute(
+            "SELECT version FROM analyses WHERE repo_id = ?", (repo_id,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def delete(self, repo_id: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM analyses WHERE repo_id = ?", (repo_id,))
+            self.connection.execute("DELETE FROM indexes WHERE repo_id = ?", (repo_id,))
+            self.connection.execute("DELETE FROM archives WHERE repo_id = ?", (repo_id,))
+            self.connection.execute("DELETE FROM usage WHERE repo_id = ?", (repo_id,))
+            self.connection.commit()
+
+    def touch(self, repo_id: str):
+        with self.lock:
+            self.connection.execute("UPDATE usage SET last_used = ? WHERE repo_id = ?", (time.time(), repo_id))
+            self.connection.commit()
+
+    def usage(self) -> List[Tuple[str, int, float]]:
+        return self._reader().execute("SELECT repo_id, size, last_used FROM usage").fetchall()
+
+    def save_index(self, repo_id: str, kind: str, index: Dict[str, Any]):
+        value = json.dumps(index)
+        with self.lock:
+            replaced = self.connection.execute(
+                "SELECT length(CAST(value AS BLOB)) FROM indexes WHERE repo_id = ? AND kind = ?", (repo_id, kind)
+            ).fetchone()
+            # Only keep indexes of analyses that still exist
+            self.connection.execute(
+                "INSERT OR REPLACE INTO indexes (repo_id, kind, value) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM analyses WHERE repo_id = ?)",
+                (repo_id, kind, value, repo_id),
+            )
+            self.connection.execute(
+                "UPDATE usage SET size = size + ? WHERE repo_id = ?",
+                (len(value) - (replaced[0] if replaced else 0), repo_id),
+            )
+            self.connection.commit()
+
+    def load_index(self, repo_id: str, kind: str) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute(
+            "SELECT value FROM indexes WHERE repo_id = ? AND kind = ?", (repo_id, kind)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_archive(self, content_hash: str, repo_id: str):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO archives (content_hash, repo_id) VALUES (?, ?)",
+                (content_hash, repo_id),
+            )
+            self.connection.commit()
+
+    def get_archive(self, content_hash: str) -> Optional[str]:
+        row = self._reader().execute(
+            "SELECT repo_id FROM archives WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def save_job(self, job: Dict[str, Any]):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO jobs (job_id, value, finished_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET value = excluded.value, finished_at = excluded.finished_at",
+                (job["job_id"], json.dumps(job), job.get("finished_at")),
+            )
+            self.connection.commit()
+
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute("SELECT value FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def request_cancel(self, job_id: str):
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+            self.connection.commit()
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._reader().execute(
+            "SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def prune_jobs(self, finished_before: float):
+        with self.lock:
+            self.connection.execute("DELETE FROM jobs WHERE finished_at < ?", (finished_before,))
+            self.connection.commit()
+
+
+def get_analysis_backend():
+    """Open the configured analysis backend, falling back to spill files if SQLite is unavailable."""
+    if ANALYSIS_STORE_BACKEND == "sqlite":
+        try:
+            return SQLiteBackend()
+        except sqlite3.Error as e:
+            print(f"Shared analysis store unavailable, keeping analyses in this process: {e}")
+    return FileBackend()
+
+
+class AnalysisCache:
+    """
+    Dict-like cache of analyses with a memory budget over a persistent backend.
+
+    Least recently used (or expired) analyses are dropped from memory and
+    transparently loaded back from the backend when they are requested again.
+    With a write-through backend every analysis is persisted as soon as it is
+    cached, and in-memory copies are checked against the backend's version so
+    deletes and rewrites by other processes are seen.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = ANALYSIS_CACHE_MAX_BYTES,
+        ttl_seconds: int = ANALYSIS_CACHE_TTL_SECONDS,
+        backend: Optional[Any] = None,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Args:
+            max_bytes: Memory budget for analyses kept in memory
+            ttl_seconds: Idle time after which an analysis is dropped from memory
+            backend: FileBackend or SQLiteBackend; spill files in ANALYSIS_SPILL_DIR by default
+            on_evict: Called with the repo_id of each analysis moved out of memory
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend if backend is not None else FileBackend()
+        self.on_evict = on_evict
+        # repo_id -> (results, size, last_used, version), least recently used first;
+        # version is None until the analysis is persisted
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.total_bytes = 0
+        # repo_id -> analysis evicted from memory and not written to the backend yet
+        self.spilling: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.RLock()
+        self.spill_lock = threading.Lock()
+        # repo_id -> when its last use was written to the backend
+        self.touched: Dict[str, float] = {}
+
+    def __setitem__(self, repo_id: str, results: Dict[str, Any]):
+        # Serializing and writing a large analysis takes a while; only the swap holds the lock
+        if self.backend.write_through:
+            version = self.backend.save(repo_id, results)
+        else:
+            # A spilled copy of an older analysis under this id is now stale
+            self.backend.delete(repo_id)
+            version = None
+        with self.lock:
+            self.spilling.pop(repo_id, None)
+            self._store(repo_id, results, version)
+        self._spill_evicted()
+
+    def __getitem__(self, repo_id: str) -> Dict[str, Any]:
+        results = self.get(repo_id)
+        if results is None:
+            raise KeyError(repo_id)
+        return results
+
+    def __contains__(self, repo_id: str) -> bool:
+        current = self.backend.version(repo_id)
+        with self.lock:
+            if repo_id in self.entries and self._is_current(repo_id, current):
+                return True
+            if repo_id in self.spilling:
+                return True
+        return current is not None
+
+    def __delitem__(self, repo_id: str):
+        if repo_id not in self:
+            raise KeyError(repo_id)
+        with self.lock:
+            self._discard(repo_id)
+            self.spilling.pop(repo_id, None)
+        self.backend.delete(repo_id)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, repo_id: str, default: Any = None) -> Any:
+        """
+        Get an analysis, loading it from the backend if it is not in memory.
+
+        The backend is read without holding the lock, so lookups of other
+        analyses are not held up by a large load or save.
+        """
+        current = self.backend.version(repo_id) if self.backend.write_through else None
+        with self.lock:
+            entry = self.entries.get(repo_id)
+            hit = entry is not None and self._is_current(repo_id, current)
+            if hit:
+                results, size, _, version = entry
+                self.entries[repo_id] = (results, size, time.time(), version)
+                self.entries.move_to_end(repo_id)
+                self._evict()
+            elif repo_id in self.spilling:
+                return self.spilling[repo_id]
+        if hit:
+            self._spill_evicted()
+            self._touch(repo_id)
+            return results
+
+        loaded = self.backend.load(repo_id)
+        if loaded is None:
+            return default
+        results, version = loaded
+        with self.lock:
+            entry = self.entries.get(repo_id)
+            if entry is not None and entry[3] is not None and entry[3] >= version:
+                # Loaded or rewritten by another thread meanwhile
+                return entry[0]
+            self._store(repo_id, results, version)
+        self._spill_evicted()
+        self._touch(repo_id)
+        return results
+
+    def select_pruned(
+        self,
+        max_bytes: int = ANALYSIS_STORE_MAX_BYTES,
+        ttl_seconds: int = ANALYSIS_STORE_TTL_SECONDS,
+        extra_bytes: Optional[Callable[[str], int]] = None
+    ) -> List[str]:
+        """
+        Pick stored analyses to delete so the backend stays within its disk budget.
+
+        Analyses unused for ttl_seconds go first, then the least recently used
+        until the stored size is within max_bytes. Analyses held in memory
+        here were used recently and are kept.
+
+        Args:
+            max_bytes: Disk budget; 0 means unbounded
+            ttl_seconds: Idle time after which an analysis is deleted; 0 disables expiry
+            extra_bytes: Disk used outside the backend by an analysis, e.g. its source content
+        """
+        if not max_bytes and not ttl_seconds:
+            return []
+        usage = sorted(
+            ((repo_id, size + (extra_bytes(repo_id) if extra_bytes else 0), last_used)
+             for repo_id, size, last_used in self.backend.usage()),
+            key=lambda item: item[2]
+        )
+        total = sum(size for _, size, _ in usage)
+        expired_before = time.time() - ttl_seconds if ttl_seconds else None
+        with self.lock:
+            in_memory = set(self.entries) | set(self.spilling)
+
+        pruned = []
+        for repo_id, size, last_used in usage:
+            over_budget = max_bytes and total > max_bytes
+            expired = expired_before is not None and last_used < expired_before
+            if not (over_budget or expired):
+                break
+            if repo_id in in_memory:
+                continue
+            pruned.append(repo_id)
+            total -= size
+        return pruned
+
+    def _touch(self, repo_id: str):
+        """Record a use of an analysis in the backend, at most every ANALYSIS_TOUCH_INTERVAL_SECONDS."""
+        now = time.time()
+        with self.lock:
+            if now - self.touched.get(repo_id, 0) < ANALYSIS_TOUCH_INTERVAL_SECONDS:
+                return
+            self.touched[repo_id] = now
+        self.backend.touch(repo_id)
+
+    def _is_current(self, repo_id: str, current: Optional[int]) -> bool:
+        """
+        Check an in-memory analysis against the backend's current version,
+        dropping it if another process changed it.
+        """
+        if not self.backend.write_through:
+            return True
+        if current == self.entries[repo_id][3]:
+            return True
+        self._discard(repo_id)
+        if self.on_evict is not None:
+            self.on_evict(repo_id)
+        return False
+
+    def _store(self, repo_id: str, results: Dict[str, Any], version: Optional[int]):
+        self._discard(repo_id)
+        size = estimate_analysis_size(results)
+        self.entries[repo_id] = (results, size, time.time(), version)
+        self.total_bytes += size
+        self._evict()
+
+    def _discard(self, repo_id: str):
+        self.touched.pop(repo_id, None)
+        entry = self.entries.pop(repo_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def _evict(self):
+        """Move analyses over the budget or expired out of memory; called with the lock held."""
+        expired_before = time.time() - self.ttl_seconds if self.ttl_seconds else None
+        while self.entries:
+            repo_id, (results, size, last_used, version) = next(iter(self.entries.items()))
+            over_budget = self.max_bytes and self.total_bytes > self.max_bytes
+            expired = expired_before is not None and last_used < expired_before
+            if not (over_budget or expired):
+                break
+            if version is None:
+                # Not persisted yet: written by _spill_evicted once the lock is released,
+                # and served from here until then
+                self.spilling[repo_id] = results
+            self._discard(repo_id)
+            if self.on_evict is not None:
+                self.on_evict(repo_id)
+
+    def _spill_evicted(self):
+        """Write analyses evicted from memory to the backend, outside the lock."""
+        while self.spilling:
+            # One writer at a time, so the same analysis is never written twice at
+            # once; a thread finding another one writing leaves its analyses to it
+            if not self.spill_lock.acquire(blocking=False):
+                return
+            try:
+                while True:
+                    with self.lock:
+                        if not self.spilling:
+                            break
+                        repo_id, results = next(iter(self.spilling.items()))
+                    self.backend.save(repo_id, results)
+                    with self.lock:
+                        if self.spilling.get(repo_id) is results:
+                            del self.spilling[repo_id]
+            finally:
+                self.spill_lock.release()
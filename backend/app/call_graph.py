@@ -0,0 +1,182 @@
+"""Function-level call graph for transitive impact queries."""
+
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Iterable, Optional, Tuple
+
+from .symbol_index import SymbolIndex
+
+
+# Traversal results kept per analysis
+CALL_GRAPH_QUERY_CACHE_SIZE = int(os.getenv("CALL_GRAPH_QUERY_CACHE_SIZE", "1024"))
+
+DIRECTIONS = ("upstream", "downstream")
+
+# A call resolved by name alone links to at most this many same-named functions
+MAX_AMBIGUOUS_CALLEES = int(os.getenv("MAX_AMBIGUOUS_CALLEES", "10"))
+
+
+def compress_edges(node_count: int, edges: List[Tuple[int, int]]) -> Tuple[array, array]:
+    """Pack (source, target) pairs into CSR offsets and targets, grouped by source."""
+    offsets = array('l', [0]) * (node_count + 1)
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+
+    targets = array('l', [0]) * len(edges)
+    position = offsets[:-1]
+    for source, target in edges:
+        targets[position[source]] = target
+        position[source] += 1
+    return offsets, targets
+
+
+class CallGraph:
+    """
+    Which function calls which, across the whole repository.
+
+    Functions are numbered with compact integer ids and edges are kept as
+    CSR arrays in both directions, so bounded-depth traversals touch only
+    the functions they reach.
+    """
+
+    def __init__(self, functions: List[Tuple[str, str]], edges: List[Tuple[int, int]]):
+        """
+        Args:
+            functions: (file path, function name) of each node, indexed by id
+            edges: (caller id, callee id) pairs
+        """
+        self.functions = functions
+        self.ids: Dict[Tuple[str, str], int] = {function: i for i, function in enumerate(functions)}
+        self.edge_count = len(edges)
+        self.out_offsets, self.out_targets = compress_edges(len(functions), edges)
+        self.in_offsets, self.in_targets = compress_edges(
+            len(functions), [(callee, caller) for caller, callee in edges]
+        )
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(
+        cls,
+        symbol_index: SymbolIndex,
+        file_edges: Iterable[Tuple[str, str]],
+        excluded: Optional[set] = None
+    ) -> "CallGraph":
+        """
+        Build the call graph from the span tables of a symbol index.
+
+        A called name resolves to functions of that name in the calling file,
+        else in the files it imports, else in its directory (its Java
+        package), else anywhere in the repository as long as that is at
+        most MAX_AMBIGUOUS_CALLEES functions.
+
+        Args:
+            symbol_index: Call-site index of the analysis
+            file_edges: File-level dependency edges (importer, imported)
+            excluded: Called names that are never functions, e.g. keywords
+        """
+        excluded = excluded or set()
+        functions: List[Tuple[str, str]] = []
+        definitions: Dict[str, List[int]] = {}
+        # file path -> function name -> id
+        by_file: Dict[str, Dict[str, int]] = {}
+        # directory -> function name -> ids
+        by_directory: Dict[str, Dict[str, List[int]]] = {}
+        for file_path, spans in symbol_index.spans.items():
+            directory = file_path.rpartition("/")[0]
+            for name in spans:
+                function_id = len(functions)
+                functions.append((file_path, name))
+                definitions.setdefault(name, []).append(function_id)
+                by_file.setdefault(file_path, {})[name] = function_id
+                by_directory.setdefault(directory, {}).setdefault(name, []).append(function_id)
+
+        imports: Dict[str, List[str]] = {}
+        for source, target in file_edges:
+            imports.setdefault(source, []).append(target)
+
+        edges: List[Tuple[int, int]] = []
+        for caller, (file_path, name) in enumerate(functions):
+            local = by_file[file_path]
+            imported = imports.get(file_path, [])
+            siblings = by_directory[file_path.rpartition("/")[0]]
+            for called in symbol_index.spans[file_path][name]["calls"]:
+                if called in excluded or called not in definitions:
+                    continue
+                if called in local:
+                    targets = [local[called]]
+                else:
+                    targets = [
+                        by_file[other][called] for other in imported
+                        if called in by_file.get(other, ())
+                    ]
+                    if not targets:
+                        targets = siblings.get(called, [])
+                    if not targets and len(definitions[called]) <= MAX_AMBIGUOUS_CALLEES:
+                        targets = definitions[called]
+                edges.extend((caller, callee) for callee in targets if callee != caller)
+
+        return cls(functions, edges)
+
+    def get_id(self, file_path: str, function_name: str) -> Optional[int]:
+        """Get the node id of a function."""
+        return self.ids.get((file_path, function_name))
+
+    def traverse(self, node: int, direction: str, max_depth: int, max_nodes: int) -> Tuple[List[Tuple[int, int]], bool]:
+        """
+        Breadth-first search from a function, up to a number of hops.
+
+        Args:
+            node: Starting function id
+            direction: "upstream" for callers, "downstream" for callees
+            max_depth: Largest number of hops to follow
+            max_nodes: Largest number of functions to return
+
+        Returns:
+            (function id, hops) of every reached function, nearest first, and
+            whether the result was cut off at max_nodes
+        """
+        key = (node, direction, max_depth, max_nodes)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        if direction == "upstream":
+            offsets, targets = self.in_offsets, self.in_targets
+        else:
+            offsets, targets = self.out_offsets, self.out_targets
+
+        seen = {node}
+        reached: List[Tuple[int, int]] = []
+        frontier = [node]
+        truncated = False
+        depth = 0
+        while frontier and depth < max_depth and not truncated:
+            depth += 1
+            next_frontier = []
+            for current in frontier:
+                for neighbor in targets[offsets[current]:offsets[current + 1]]:
+                    if neighbor in seen:
+                        continue
+                    if len(reached) >= max_nodes:
+                        truncated = True
+                        break
+                    seen.add(neighbor)
+                    reached.append((neighbor, depth))
+                    next_frontier.append(neighbor)
+                if truncated:
+                    break
+            frontier = next_frontier
+
+        result = (reached, truncated)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > CALL_GRAPH_QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
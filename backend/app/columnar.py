@@ -0,0 +1,148 @@
+"""Compact columnar encoding of analysis responses."""
+
+import json
+from typing import Dict, List, Any, Optional
+
+from fastapi.responses import Response
+
+from .function_table import FunctionTable
+
+try:
+    import orjson
+except ImportError:
+    # Responses are encoded with the standard library when orjson is not installed
+    orjson = None
+    print("orjson not installed: responses are encoded with the slower standard json module")
+
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.legacymap.columnar+json"
+
+# Sections made of records that are turned into columns
+RECORD_SECTIONS = ("files", "functions")
+
+
+class StringTable:
+    """Every distinct string of a response stored once and referenced by index."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.ids[value] = string_id
+        return string_id
+
+
+def _encode_value(value: Any, strings: StringTable) -> Any:
+    if isinstance(value, str):
+        return strings.add(value)
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return [strings.add(item) for item in value]
+    return value
+
+
+def _to_columns(records: List[Dict[str, Any]], strings: StringTable) -> Dict[str, Any]:
+    """
+    Turn records into one array per field.
+
+    Fields holding strings or lists of strings are stored as string table
+    indexes and listed in ``string_columns``; records missing a field get null.
+    """
+    names: List[str] = []
+    for record in records:
+        for name in record:
+            if name not in names:
+                names.append(name)
+
+    columns = {}
+    string_columns = []
+    for name in names:
+        values = [record.get(name) for record in records]
+        if any(isinstance(value, str) or (isinstance(value, list) and value and isinstance(value[0], str))
+               for value in values):
+            string_columns.append(name)
+            values = [_encode_value(value, strings) for value in values]
+        columns[name] = values
+
+    return {"count": len(records), "columns": columns, "string_columns": string_columns}
+
+
+def _table_to_columns(table: FunctionTable, strings: StringTable) -> Dict[str, Any]:
+    """Column-encode a FunctionTable straight from its arrays, without building dicts."""
+    file_ids = [strings.add(value) for value in table.files.values]
+    language_ids = [strings.add(value) for value in table.languages.values]
+    type_ids = [strings.add(value) for value in table.types.values]
+    return {
+        "count": len(table),
+        "columns": {
+            "name": [strings.add(name) for name in table.names],
+            "type": [type_ids[i] for i in table.type_ids],
+            "file": [file_ids[i] for i in table.file_ids],
+            "line": table.lines.tolist(),
+            "language": [language_ids[i] for i in table.language_ids],
+        },
+        "string_columns": ["name", "type", "file", "language"],
+    }
+
+
+def to_columnar(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Encode an analysis response in the columnar format.
+
+    ``files`` and ``functions`` become column arrays, dependency graph nodes
+    and edges become string table indexes, and every other section is kept
+    as is. Strings shared across sections, such as file paths, are stored once.
+    """
+    strings = StringTable()
+    encoded: Dict[str, Any] = {"format": "columnar"}
+
+    for key, value in analysis.items():
+        if isinstance(value, FunctionTable):
+            encoded[key] = _table_to_columns(value, strings)
+        elif key in RECORD_SECTIONS and isinstance(value, list):
+            encoded[key] = _to_columns(value, strings)
+        elif key == "dependency_graph" and isinstance(value, dict):
+            edges = value.get("edges", [])
+            encoded[key] = {
+                "nodes": [strings.add(node) for node in value.get("nodes", [])],
+                "sources": [strings.add(source) for source, _ in edges],
+                "targets": [strings.add(target) for _, target in edges],
+            }
+        else:
+            encoded[key] = value
+
+    encoded["strings"] = strings.strings
+    return encoded
+
+
+def encode_json(content: Any) -> bytes:
+    """Serialize a response body, with orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def wants_columnar(response_format: Optional[str], accept: Optional[str]) -> bool:
+    """Check whether a request asked for the columnar format by query parameter or Accept header."""
+    if response_format is not None:
+        return response_format == "columnar"
+    return accept is not None and COLUMNAR_MEDIA_TYPE in accept
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with encode_json."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+class ColumnarResponse(FastJSONResponse):
+    """Columnar analysis response."""
+
+    media_type = COLUMNAR_MEDIA_TYPE
@@ -0,0 +1,147 @@
+"""Compact on-disk store of the source content of an analysis."""
+
+import os
+import json
+import mmap
+import uuid
+from typing import Dict, List, Optional
+
+from .utils import DATA_DIR
+
+
+# Directory holding one blob and offset table per analysis
+CONTENT_STORE_DIR = os.getenv("CONTENT_STORE_DIR", os.path.join(DATA_DIR, "content"))
+
+
+class ContentStore:
+    """
+    Every file's source concatenated into one blob with an offset table.
+
+    Files are addressed by the file id assigned when they were added. The
+    blob is memory-mapped for reading, so only the pages of files that are
+    actually requested are loaded.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Base path of the store; the blob is ``path.blob`` and the
+                offset table ``path.json``
+        """
+        self.path = path
+        self.paths: List[str] = []
+        self.offsets: List[List[int]] = []
+        self.file_ids: Dict[str, int] = {}
+        self._writer = None
+        self._size = 0
+        self._file = None
+        self._mmap = None
+
+    @classmethod
+    def create(cls, directory: str = CONTENT_STORE_DIR) -> "ContentStore":
+        """Start a new store in a directory."""
+        os.makedirs(directory, exist_ok=True)
+        store = cls(os.path.join(directory, uuid.uuid4().hex))
+        store._writer = open(f"{store.path}.blob", 'wb')
+        return store
+
+    @classmethod
+    def open(cls, path: str) -> Optional["ContentStore"]:
+        """Open a finished store, or return None if it does not exist."""
+        try:
+            with open(f"{path}.json", 'r', encoding='utf-8') as f:
+                table = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        store = cls(path)
+        store.paths = table["paths"]
+        store.offsets = table["offsets"]
+        store.file_ids = {file_path: file_id for file_id, file_path in enumerate(store.paths)}
+        return store
+
+    @staticmethod
+    def disk_size(path: str) -> int:
+        """Get the bytes a store takes on disk, or 0 if it does not exist."""
+        size = 0
+        for suffix in (".blob", ".json"):
+            try:
+                size += os.stat(f"{path}{suffix}").st_size
+            except FileNotFoundError:
+                pass
+        return size
+
+    def add(self, file_path: str, content: str) -> int:
+        """Append a file's content and return its file id."""
+        data = content.encode('utf-8', errors='surrogatepass')
+        self._writer.write(data)
+
+        file_id = len(self.paths)
+        self.paths.append(file_path)
+        self.offsets.append([self._size, len(data)])
+        self.file_ids[file_path] = file_id
+        self._size += len(data)
+        return file_id
+
+    def finish(self):
+        """Close the blob and write the offset table."""
+        self._writer.close()
+        self._writer = None
+        with open(f"{self.path}.json", 'w', encoding='utf-8') as f:
+            json.dump({"paths": self.paths, "offsets": self.offsets}, f)
+
+    def get_file_id(self, file_path: str) -> Optional[int]:
+        """Get the id of a file by path."""
+        return self.file_ids.get(file_path)
+
+    def get(self, file_id: int) -> str:
+        """Get the content of a file."""
+        offset, length = self.offsets[file_id]
+        if length == 0:
+            return ""
+        while True:
+            mapped = self._mmap
+            if mapped is None:
+                self._file = open(f"{self.path}.blob", 'rb')
+                mapped = self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                data = mapped[offset:offset + length]
+                break
+            except ValueError:
+                # Closed by another thread in between; map the blob again
+                if self._mmap is mapped:
+                    self._mmap = None
+        return data.decode('utf-8', errors='surrogatepass')
+
+    def get_lines(self, file_id: int, start_line: int = 1, end_line: Optional[int] = None) -> List[str]:
+        """Get an inclusive, 1-based range of lines of a file."""
+        lines = self.get(file_id).split("\n")
+        return lines[max(start_line, 1) - 1:end_line]
+
+    def close(self):
+        """Release the memory map and any open file handles."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def move_to(self, path: str):
+        """Move the store's files to a new base path."""
+        self.close()
+        for suffix in (".blob", ".json"):
+            os.replace(f"{self.path}{suffix}", f"{path}{suffix}")
+        self.path = path
+
+    def delete(self):
+        """Remove the store's files."""
+        self.close()
+        for suffix in (".blob", ".json"):
+            try:
+                os.unlink(f"{self.path}{suffix}")
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,52 @@
+"""Resolve Java imports to project files through qualified-name indexes."""
+
+from typing import Dict, List, Optional
+from pathlib import PurePosixPath
+
+
+class DependencyResolver:
+    """
+    Map imports to the files that declare them.
+
+    Each Java file is indexed by its fully qualified class name (package
+    declaration plus file name) and by its package, so resolving an import
+    is a handful of dictionary lookups rather than a scan over every file.
+    """
+
+    def __init__(self):
+        # fully qualified class name -> file path
+        self.classes: Dict[str, str] = {}
+        # package name -> file paths in that package
+        self.packages: Dict[str, List[str]] = {}
+
+    def add_file(self, file_path: str, package: Optional[str]):
+        """Index a file under its qualified class name and package."""
+        class_name = PurePosixPath(file_path).stem
+        package = package or ""
+        qualified_name = f"{package}.{class_name}" if package else class_name
+        self.classes[qualified_name] = file_path
+        self.packages.setdefault(package, []).append(file_path)
+
+    def resolve(self, imported: str) -> List[str]:
+        """
+        Get the project files an import refers to.
+
+        Handles class imports, wildcard package imports (``com.foo.*``),
+        static member imports and nested classes by trimming trailing
+        segments until a known class is found.
+        """
+        if imported.endswith(".*"):
+            owner = imported[:-2]
+            if owner in self.packages:
+                return list(self.packages[owner])
+            # import static com.foo.Bar.*; imports members of a class
+            imported = owner
+
+        name = imported
+        while name:
+            if name in self.classes:
+                return [self.classes[name]]
+            if "." not in name:
+                break
+            name = name.rsplit(".", 1)[0]
+        return []
@@ -0,0 +1,98 @@
+"""Adjacency lists of the file dependency graph for neighborhood queries."""
+
+import os
+from typing import Dict, List, Iterable, Optional, Tuple
+
+from .call_graph import compress_edges
+
+
+# Largest number of files a neighborhood may contain
+MAX_NEIGHBORHOOD_NODES = int(os.getenv("MAX_NEIGHBORHOOD_NODES", "2000"))
+
+
+class FileGraph:
+    """
+    The dependency graph as CSR adjacency lists indexed by node id.
+
+    Node ids are positions in the analysis' file list. Built once per
+    analysis so a neighborhood costs time proportional to its own size.
+    """
+
+    def __init__(self, nodes: List[str], edges: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            nodes: File paths, in the order of the analysis' files
+            edges: (importer, imported) pairs
+        """
+        self.nodes = nodes
+        self.ids: Dict[str, int] = {node: i for i, node in enumerate(nodes)}
+        pairs = [(self.ids[source], self.ids[target]) for source, target in edges]
+        self.out_offsets, self.out_targets = compress_edges(len(nodes), pairs)
+        self.in_offsets, self.in_targets = compress_edges(
+            len(nodes), [(target, source) for source, target in pairs]
+        )
+
+    def get_id(self, file_path: str) -> Optional[int]:
+        """Get the node id of a file."""
+        return self.ids.get(file_path)
+
+    def successors(self, node: int):
+        """Ids of the files a file imports."""
+        return self.out_targets[self.out_offsets[node]:self.out_offsets[node + 1]]
+
+    def predecessors(self, node: int):
+        """Ids of the files that import a file."""
+        return self.in_targets[self.in_offsets[node]:self.in_offsets[node + 1]]
+
+    def neighborhood(
+        self,
+        node: int,
+        depth: int,
+        direction: str = "both",
+        max_nodes: int = MAX_NEIGHBORHOOD_NODES
+    ) -> Tuple[Dict[int, int], List[Tuple[int, int]], bool]:
+        """
+        Collect the files within a number of hops of a file.
+
+        Args:
+            node: Starting file id
+            depth: Largest number of hops
+            direction: "out" follows imports, "in" follows importers, "both" either
+            max_nodes: Largest number of files to include, the start included
+
+        Returns:
+            File id -> hops for every included file, the edges among them,
+            and whether the neighborhood was cut off at max_nodes
+        """
+        steps = []
+        if direction in ("out", "both"):
+            steps.append(self.successors)
+        if direction in ("in", "both"):
+            steps.append(self.predecessors)
+
+        hops = {node: 0}
+        frontier = [node]
+        truncated = False
+        for distance in range(1, depth + 1):
+            next_frontier = []
+            for current in frontier:
+                for step in steps:
+                    for neighbor in step(current):
+                        if neighbor in hops:
+                            continue
+                        if len(hops) >= max_nodes:
+                            truncated = True
+                            break
+                        hops[neighbor] = distance
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+            if truncated or not frontier:
+                break
+
+        edges = [
+            (source, target)
+            for source in hops
+            for target in self.successors(source)
+            if target in hops
+        ]
+        return hops, edges, truncated
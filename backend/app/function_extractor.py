@@ -3,6 +3,12 @@
 import re
 from typing import List, Dict, Any
 
+from .java_lexer import JavaSource, lex_java
+
+
+# Bump whenever extraction output changes so cached per-file results are not reused
+EXTRACTOR_VERSION = 2
+
 
 class FunctionExtractor:
     """Extract functions and classes from source code."""
@@ -26,12 +32,19 @@ class FunctionExtractor:
         ]
         self.js_class_pattern = r"class\s+([a-zA-Z_$][a-zA-Z0-9_$]*)"
 
-        # Java patterns
-        # Class: public class MyClass {
-        self.java_class_pattern = r"(?:public|protected|private|static|\s)*class\s+([a-zA-Z_$][a-zA-Z0-9_$]*)"
-        # Method: public void myMethod(String arg) {
-        # This is complex in regex. Simplified: access modifiers? return type name (args) {
-        self.java_method_pattern = r"(?:public|protected|private|static|\s)*[\w<>[\]]+\s+([a-zA-Z_$][a-zA-Z0-9_$]*)\s*\([^)]*\)\s*(?:throws\s+[\w,\s]+)?\s*\{"
+        # Java is tokenized by java_lexer.lex_java instead of per-line patterns
+
+        # Call-site indexing patterns (compiled once, shared by every file in a scan)
+        self.call_pattern = re.compile(r"\b([a-zA-Z_$][a-zA-Z0-9_$]*)\s*\(")
+        self.python_definition_pattern = re.compile(r"^\s*def\s+([a-zA-Z_][a-zA-Z0-9_]*)")
+        self.js_definition_pattern = re.compile(
+            r"^\s*(?:function|const|let|var|class)\s+([a-zA-Z_$][a-zA-Z0-9_$]*)"
+        )
+        self.python_body_start_pattern = re.compile(r"^\s*def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(")
+        self.js_body_start_pattern = re.compile(
+            r"\b([a-zA-Z_$][a-zA-Z0-9_$]*)(?=\s*[=:]?\s*(?:async\s+)?\([^)]*\)\s*(?:=>|\{))"
+        )
+        self.call_keywords = {"if", "for", "while", "switch", "catch", "print", "println", "return"}
 
     def extract_python_functions(self, content: str, file_path: str) -> List[Dict[str, Any]]:
         """Extract Python functions and classes."""
@@ -87,41 +100,22 @@ class FunctionExtractor:
                     break
         return functions
 
+    def java_source_functions(self, source: JavaSource, file_path: str) -> List[Dict[str, Any]]:
+        """Build function and class records from lexed Java source."""
+        return [
+            {
+                "name": name,
+                "type": declaration_type,
+                "file": file_path,
+                "line": line,
+                "language": "java"
+            }
+            for name, declaration_type, line in source.declarations
+        ]
+
     def extract_java_functions(self, content: str, file_path: str) -> List[Dict[str, Any]]:
         """Extract Java functions (methods) and classes."""
-        functions = []
-        lines = content.split("\n")
-        
-        for line_num, line in enumerate(lines, 1):
-            # Check for class definition
-            class_match = re.search(self.java_class_pattern, line)
-            if class_match:
-                class_name = class_match.group(1)
-                functions.append({
-                    "name": class_name,
-                    "type": "class",
-                    "file": file_path,
-                    "line": line_num,
-                    "language": "java"
-                })
-                continue # Usually don't have class and method on same line
-
-            # Check for method definition
-            # We need to avoid matching control structures like 'if (condition) {'
-            method_match = re.search(self.java_method_pattern, line)
-            if method_match:
-                method_name = method_match.group(1)
-                # Filter out common keywords that might match the pattern
-                if method_name not in {"if", "for", "while", "switch", "catch", "synchronized"}:
-                    functions.append({
-                        "name": method_name,
-                        "type": "function", # method
-                        "file": file_path,
-                        "line": line_num,
-                        "language": "java"
-                    })
-        
-        return functions
+        return self.java_source_functions(lex_java(content), file_path)
     
     def extract_functions(self, content: str, file_path: str, language: str) -> List[Dict[str, Any]]:
         """Extract functions based on language."""
@@ -135,6 +129,9 @@ class FunctionExtractor:
     
     def find_function_calls(self, content: str, function_name: str, language: str) -> List[int]:
         """Find line numbers where a function is called."""
+        if language == "java":
+            return list(lex_java(content).call_sites.get(function_name, []))
+        
         call_lines = []
         lines = content.split("\n")
         
@@ -143,10 +140,7 @@ class FunctionExtractor:
         
         for line_num, line in enumerate(lines, 1):
             # Skip definition lines
-            if language == "java":
-                if re.search(rf"(?:class|void|int|String|public|private|protected|static)\s+{re.escape(function_name)}\b", line):
-                    continue
-            elif language == "python":
+            if language == "python":
                 if re.search(rf"^\s*def\s+{re.escape(function_name)}\b", line):
                     continue
             else:
@@ -158,17 +152,114 @@ class FunctionExtractor:
         
         return call_lines
     
+    def _definition_pattern(self, language: str):
+        if language == "python":
+            return self.python_definition_pattern
+        return self.js_definition_pattern
+
+    def _body_start_pattern(self, language: str):
+        if language == "python":
+            return self.python_body_start_pattern
+        return self.js_body_start_pattern
+
+    def _find_body_end(self, lines: List[str], func_start: int, language: str) -> int:
+        """Return the (exclusive) index of the line that ends a body starting at func_start."""
+        brace_count = 0
+        started = False
+        
+        for i in range(func_start, len(lines)):
+            line = lines[i]
+            
+            if language == "python":
+                if i > func_start and re.match(r"^\s*def\s+", line):
+                    return i
+            elif language == "java" or language in {"javascript", "typescript"}:
+                brace_count += line.count("{")
+                brace_count -= line.count("}")
+                if brace_count == 0 and started:
+                    return i
+                if not started and "{" in line:
+                    started = True
+        
+        return len(lines)
+    
+    def index_call_sites(self, lines: List[str], language: str) -> Dict[str, List[int]]:
+        """
+        Index every call site in a file in a single pass.
+        
+        Returns a mapping of called identifier to the line numbers it is called on,
+        with the same definition-line filtering as find_function_calls.
+        """
+        if language == "java":
+            return lex_java("\n".join(lines)).call_sites
+        
+        call_sites: Dict[str, List[int]] = {}
+        definition_pattern = self._definition_pattern(language)
+        
+        for line_num, line in enumerate(lines, 1):
+            if "(" not in line:
+                continue
+            
+            called = set(self.call_pattern.findall(line))
+            if not called:
+                continue
+            called.difference_update(definition_pattern.findall(line))
+            
+            for name in called:
+                call_sites.setdefault(name, []).append(line_num)
+        
+        return call_sites
+    
+    def extract_function_spans(self, lines: List[str], language: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Build the span table of function bodies in a file.
+        
+        Each entry records the first body of that name (as extract_function_dependencies
+        would find it), its 1-based start line, exclusive end line, and the identifiers
+        called inside it.
+        """
+        if language == "java":
+            return lex_java("\n".join(lines)).spans
+        
+        spans: Dict[str, Dict[str, Any]] = {}
+        body_start_pattern = self._body_start_pattern(language)
+        
+        for line_index, line in enumerate(lines):
+            if "(" not in line:
+                continue
+            for name in body_start_pattern.findall(line):
+                if name in spans or name in self.call_keywords:
+                    continue
+                body_end = self._find_body_end(lines, line_index, language)
+                calls = set()
+                for body_line in lines[line_index:body_end]:
+                    calls.update(self.call_pattern.findall(body_line))
+                spans[name] = {
+                    "start": line_index + 1,
+                    "end": body_end + 1,
+                    "calls": sorted(calls),
+                }
+        
+        return spans
+    
     def extract_function_dependencies(self, content: str, function_name: str, language: str) -> List[str]:
         """Extract what other functions this function calls."""
+        if language == "java":
+            span = lex_java(content).spans.get(function_name)
+            if span is None:
+                return []
+            return [
+                name for name in span["calls"]
+                if name not in self.call_keywords and name != function_name
+            ]
+        
         dependencies = []
         lines = content.split("\n")
         func_start = None
         
         # Find start
         for line_num, line in enumerate(lines):
-            if language == "java":
-                match = re.search(rf"\b{re.escape(function_name)}\s*\([^)]*\)\s*(?:throws\s+[\w,\s]+)?\s*\{{", line)
-            elif language == "python":
+            if language == "python":
                 match = re.match(rf"^(\s*)def\s+{re.escape(function_name)}\s*\(", line)
             else:
                 match = re.search(rf"\b{re.escape(function_name)}\s*[=:]?\s*(?:async\s+)?\([^)]*\)\s*(?:=>|\{{)", line)
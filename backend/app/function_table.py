@@ -0,0 +1,115 @@
+"""Column storage for the functions and classes of an analysis."""
+
+import sys
+from array import array
+from typing import Dict, List, Any, Iterable, Iterator
+
+
+class InternTable:
+    """Distinct strings numbered in first-seen order."""
+
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value = sys.intern(value)
+            value_id = len(self.values)
+            self.values.append(value)
+            self.ids[value] = value_id
+        return value_id
+
+
+class FunctionTable:
+    """
+    Functions and classes stored as parallel columns.
+
+    Names are interned Python strings; file, language and type are small
+    integer ids into intern tables held in arrays, so a record costs a few
+    bytes instead of a dict. Records are turned back into the public dict
+    shape only when iterated or indexed, i.e. when a response is built.
+    """
+
+    __slots__ = ("names", "lines", "file_ids", "language_ids", "type_ids", "files", "languages", "types")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.lines = array('l')
+        self.file_ids = array('l')
+        self.language_ids = array('B')
+        self.type_ids = array('B')
+        self.files = InternTable()
+        self.languages = InternTable()
+        self.types = InternTable()
+
+    @classmethod
+    def from_list(cls, records: Iterable[Dict[str, Any]]) -> "FunctionTable":
+        """Build a table from function dicts."""
+        table = cls()
+        table.extend(records)
+        return table
+
+    def append(self, name: str, function_type: str, file_path: str, line: int, language: str):
+        """Add one function or class."""
+        self.names.append(sys.intern(name))
+        self.lines.append(line)
+        self.file_ids.append(self.files.add(file_path))
+        self.language_ids.append(self.languages.add(language))
+        self.type_ids.append(self.types.add(function_type))
+
+    def extend(self, records: Iterable[Dict[str, Any]]):
+        """Add function dicts as produced by FunctionExtractor."""
+        for record in records:
+            self.append(record["name"], record["type"], record["file"], record["line"], record["language"])
+
+    def rows_by_file(self) -> Dict[str, List[int]]:
+        """Get the row numbers of each file's functions."""
+        rows: Dict[str, List[int]] = {}
+        for i, file_id in enumerate(self.file_ids):
+            rows.setdefault(self.files.values[file_id], []).append(i)
+        return rows
+
+    def copy_rows(self, source: "FunctionTable", rows: Iterable[int]):
+        """Add rows of another table without going through dicts."""
+        for i in rows:
+            self.append(
+                source.names[i],
+                source.types.values[source.type_ids[i]],
+                source.files.values[source.file_ids[i]],
+                source.lines[i],
+                source.languages.values[source.language_ids[i]],
+            )
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """Get one function in the public dict shape."""
+        return {
+            "name": self.names[i],
+            "type": self.types.values[self.type_ids[i]],
+            "file": self.files.values[self.file_ids[i]],
+            "line": self.lines[i],
+            "language": self.languages.values[self.language_ids[i]],
+        }
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Get every function in the public dict shape."""
+        return [self.record(i) for i in range(len(self.names))]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.names)):
+            yield self.record(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(len(self.names)))]
+        if index < 0:
+            index += len(self.names)
+        if not 0 <= index < len(self.names):
+            raise IndexError("function index out of range")
+        return self.record(index)
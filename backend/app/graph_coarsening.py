@@ -0,0 +1,170 @@
+"""Package-level coarsening of the file dependency graph."""
+
+import os
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import networkx as nx
+
+
+# Files returned when one super-node is expanded
+MAX_EXPANDED_FILES = int(os.getenv("MAX_EXPANDED_FILES", "500"))
+# Coarse graphs kept per analysis, one per grouping options; least recently used go first
+COARSE_GRAPHS_PER_REPO = int(os.getenv("COARSE_GRAPHS_PER_REPO", "4"))
+
+
+def _group_parts(file_data: Dict[str, Any], group_by: str) -> Tuple[List[str], str]:
+    """Get the package segments or directories of a file's group, and their separator."""
+    package = file_data.get("package")
+    if group_by == "package" and package:
+        return package.split("."), "."
+    return file_data["path"].split("/")[:-1], "/"
+
+
+def group_of(file_data: Dict[str, Any], group_by: str = "package", depth: Optional[int] = None) -> str:
+    """
+    Get the group a file belongs to.
+
+    Files are grouped by Java package, or by directory for other languages
+    and when grouping by directory. ``depth`` keeps only the first package
+    segments or directory levels.
+    """
+    parts, separator = _group_parts(file_data, group_by)
+    if depth is not None:
+        parts = parts[:depth]
+    return separator.join(parts) or "(root)"
+
+
+class CoarseGraph:
+    """
+    The dependency graph with files merged into super-nodes.
+
+    Every group becomes a super-node and file edges between groups become
+    one edge weighted by their count. With ``collapse_cycles`` groups that
+    import each other are merged again into one super-node per strongly
+    connected component, so the coarse graph is acyclic.
+    """
+
+    def __init__(
+        self,
+        files: List[Dict[str, Any]],
+        edges: Iterable[Tuple[str, str]],
+        group_by: str = "package",
+        depth: Optional[int] = None,
+        collapse_cycles: bool = True
+    ):
+        self.files = {file_data["path"]: file_data for file_data in files}
+        self.edges = [tuple(edge) for edge in edges]
+
+        groups = {path: group_of(file_data, group_by, depth) for path, file_data in self.files.items()}
+        # Levels in the deepest group; any larger depth gives the same graph as no depth
+        self.max_depth = max((len(_group_parts(file_data, group_by)[0]) for file_data in self.files.values()), default=0)
+        group_graph = nx.DiGraph()
+        group_graph.add_nodes_from(sorted(set(groups.values())))
+        for source, target in self.edges:
+            if groups[source] != groups[target]:
+                group_graph.add_edge(groups[source], groups[target])
+
+        # group -> super-node id
+        self.node_of: Dict[str, str] = {group: group for group in group_graph}
+        # super-node id -> groups it contains
+        self.groups: Dict[str, List[str]] = {group: [group] for group in group_graph}
+        if collapse_cycles:
+            cycles = sorted(
+                sorted(component)
+                for component in nx.strongly_connected_components(group_graph)
+                if len(component) > 1
+            )
+            for number, component in enumerate(cycles, 1):
+                node_id = f"cycle:{number}"
+                self.groups[node_id] = component
+                for group in component:
+                    del self.groups[group]
+                    self.node_of[group] = node_id
+
+        # file path -> super-node id
+        self.file_node = {path: self.node_of[group] for path, group in groups.items()}
+        self.members: Dict[str, List[str]] = {node_id: [] for node_id in self.groups}
+        for path, node_id in self.file_node.items():
+            self.members[node_id].append(path)
+
+        # (source super-node, target super-node) -> number of file edges
+        self.weights: Dict[Tuple[str, str], int] = {}
+        # super-node id -> file edges touching it, for expansion
+        self.node_edges: Dict[str, List[Tuple[str, str]]] = {node_id: [] for node_id in self.groups}
+        for source, target in self.edges:
+            key = (self.file_node[source], self.file_node[target])
+            self.node_edges[key[0]].append((source, target))
+            if key[0] != key[1]:
+                self.weights[key] = self.weights.get(key, 0) + 1
+                self.node_edges[key[1]].append((source, target))
+
+    def _describe(self, node_id: str) -> Dict[str, Any]:
+        members = [self.files[path] for path in self.members[node_id]]
+        return {
+            "id": node_id,
+            "kind": "cycle" if node_id.startswith("cycle:") else "group",
+            "groups": self.groups[node_id],
+            "file_count": len(members),
+            "loc": sum(file_data.get("loc", 0) for file_data in members),
+            "max_risk_score": max((file_data.get("risk_score", 0) for file_data in members), default=0),
+            "high_risk_count": sum(1 for file_data in members if file_data.get("risk_level") == "HIGH"),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the super-nodes and weighted edges."""
+        return {
+            "nodes": [self._describe(node_id) for node_id in self.groups],
+            "edges": [
+                {"source": source, "target": target, "weight": weight}
+                for (source, target), weight in self.weights.items()
+            ],
+        }
+
+    def expand(self, node_id: str, limit: int = MAX_EXPANDED_FILES) -> Optional[Dict[str, Any]]:
+        """
+        Get the files of one super-node, riskiest first, with the edges among
+        them and their edges to other super-nodes weighted by count.
+
+        Returns:
+            None if there is no such super-node
+        """
+        if node_id not in self.members:
+            return None
+
+        members = sorted(
+            self.members[node_id],
+            key=lambda path: (-self.files[path].get("risk_score", 0), path)
+        )
+        shown = set(members[:limit])
+
+        internal = []
+        external: Dict[Tuple[str, str], int] = {}
+        for source, target in self.node_edges[node_id]:
+            if source in shown and target in shown:
+                internal.append({"source": source, "target": target})
+            elif source in shown and self.file_node[target] != node_id:
+                key = (source, self.file_node[target])
+                external[key] = external.get(key, 0) + 1
+            elif target in shown and self.file_node[source] != node_id:
+                key = (self.file_node[source], target)
+                external[key] = external.get(key, 0) + 1
+
+        return {
+            "node": self._describe(node_id),
+            "files": [
+                {
+                    "path": path,
+                    "language": self.files[path].get("language"),
+                    "loc": self.files[path].get("loc", 0),
+                    "risk_score": self.files[path].get("risk_score", 0),
+                    "risk_level": self.files[path].get("risk_level"),
+                }
+                for path in members[:limit]
+            ],
+            "truncated": len(members) > limit,
+            "edges": internal,
+            "external_edges": [
+                {"source": source, "target": target, "weight": weight}
+                for (source, target), weight in external.items()
+            ],
+        }
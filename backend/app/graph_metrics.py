@@ -0,0 +1,227 @@
+"""Whole-graph dependency metrics and vectorized risk scoring."""
+
+import os
+from typing import Dict, List, Iterable, Optional, Tuple
+
+import networkx as nx
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+except ImportError:
+    # Metrics fall back to pure Python when NumPy/SciPy are not installed
+    np = None
+    sparse = None
+    print("NumPy/SciPy not installed: graph metrics use the much slower pure-Python fallback")
+
+from .utils import calculate_risk_score, get_risk_level
+
+
+# "basic" scores files on LOC and direct imports only; "graph" adds PageRank,
+# transitive fan-in and import-cycle size
+RISK_MODEL = os.getenv("RISK_MODEL", "basic")
+
+PAGERANK_ALPHA = 0.85
+PAGERANK_TOLERANCE = 1.0e-6
+PAGERANK_MAX_ITERATIONS = 100
+
+
+def to_csr(node_count: int, sources: List[int], targets: List[int]):
+    """Export (source, target) node id pairs as a CSR adjacency matrix."""
+    data = np.ones(len(sources), dtype=np.float64)
+    matrix = sparse.csr_matrix((data, (sources, targets)), shape=(node_count, node_count))
+    # Repeated edges count once
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def _pagerank_sparse(matrix) -> "np.ndarray":
+    node_count = matrix.shape[0]
+    out_degree = np.asarray(matrix.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, out_degree, out=np.zeros(node_count), where=out_degree != 0)
+    transition = (sparse.diags(inverse) @ matrix).T.tocsr()
+    dangling = out_degree == 0
+
+    rank = np.full(node_count, 1.0 / node_count)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        previous = rank
+        rank = PAGERANK_ALPHA * (transition @ rank + rank[dangling].sum() / node_count)
+        rank += (1.0 - PAGERANK_ALPHA) / node_count
+        if np.abs(rank - previous).sum() < node_count * PAGERANK_TOLERANCE:
+            break
+    return rank
+
+
+def _pagerank_python(node_count: int, sources: List[int], targets: List[int]) -> List[float]:
+    successors: List[set] = [set() for _ in range(node_count)]
+    for source, target in zip(sources, targets):
+        successors[source].add(target)
+
+    rank = [1.0 / node_count] * node_count
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        dangling = sum(rank[i] for i in range(node_count) if not successors[i])
+        base = PAGERANK_ALPHA * dangling / node_count + (1.0 - PAGERANK_ALPHA) / node_count
+        updated = [base] * node_count
+        for i, targets_of in enumerate(successors):
+            if targets_of:
+                share = PAGERANK_ALPHA * rank[i] / len(targets_of)
+                for target in targets_of:
+                    updated[target] += share
+        change = sum(abs(a - b) for a, b in zip(updated, rank))
+        rank = updated
+        if change < node_count * PAGERANK_TOLERANCE:
+            break
+    return rank
+
+
+def _components_python(node_count: int, sources: List[int], targets: List[int]) -> Tuple[int, List[int]]:
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(node_count))
+    graph.add_edges_from(zip(sources, targets))
+    labels = [0] * node_count
+    component_count = 0
+    for component_count, component in enumerate(nx.strongly_connected_components(graph), 1):
+        for node in component:
+            labels[node] = component_count - 1
+    return component_count, labels
+
+
+def _transitive_fan_in(
+    component_count: int,
+    labels: List[int],
+    component_sizes: List[int],
+    sources: List[int],
+    targets: List[int]
+) -> List[int]:
+    """
+    Count, for every node, the other nodes that reach it.
+
+    Ancestor sets are propagated as bitsets over the condensation in
+    topological order. Bits are laid out by component, so a component's own
+    members are one contiguous mask, and a component's bitset is released
+    as soon as it has been pushed to its successors.
+    """
+    starts = [0] * component_count
+    for component in range(1, component_count):
+        starts[component] = starts[component - 1] + component_sizes[component - 1]
+
+    successors: List[set] = [set() for _ in range(component_count)]
+    for source, target in zip(sources, targets):
+        if labels[source] != labels[target]:
+            successors[labels[source]].add(labels[target])
+    in_degree = [0] * component_count
+    for targets_of in successors:
+        for target in targets_of:
+            in_degree[target] += 1
+
+    ancestors = [0] * component_count
+    counts = [0] * component_count
+    ready = [component for component in range(component_count) if in_degree[component] == 0]
+    while ready:
+        component = ready.pop()
+        size = component_sizes[component]
+        counts[component] = ancestors[component].bit_count() + size - 1
+        reach = ancestors[component] | (((1 << size) - 1) << starts[component])
+        ancestors[component] = 0
+        for successor in successors[component]:
+            ancestors[successor] |= reach
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                ready.append(successor)
+
+    return [counts[label] for label in labels]
+
+
+def compute_graph_metrics(nodes: List[str], edges: Iterable[Tuple[str, str]]) -> Dict[str, list]:
+    """
+    Compute whole-graph metrics of the file dependency graph.
+
+    Args:
+        nodes: File paths
+        edges: (importer, imported) pairs
+
+    Returns:
+        ``pagerank``, ``transitive_fan_in`` and ``scc_size`` lists aligned with nodes
+    """
+    node_count = len(nodes)
+    if node_count == 0:
+        return {"pagerank": [], "transitive_fan_in": [], "scc_size": []}
+
+    ids = {node: i for i, node in enumerate(nodes)}
+    sources: List[int] = []
+    targets: List[int] = []
+    for source, target in edges:
+        sources.append(ids[source])
+        targets.append(ids[target])
+
+    if np is not None:
+        matrix = to_csr(node_count, sources, targets)
+        pagerank = _pagerank_sparse(matrix).tolist()
+        component_count, label_array = connected_components(matrix, directed=True, connection="strong")
+        component_sizes = np.bincount(label_array, minlength=component_count)
+        scc_size = component_sizes[label_array].tolist()
+        labels = label_array.tolist()
+        component_sizes = component_sizes.tolist()
+    else:
+        pagerank = _pagerank_python(node_count, sources, targets)
+        component_count, labels = _components_python(node_count, sources, targets)
+        component_sizes = [0] * component_count
+        for label in labels:
+            component_sizes[label] += 1
+        scc_size = [component_sizes[label] for label in labels]
+
+    return {
+        "pagerank": pagerank,
+        "transitive_fan_in": _transitive_fan_in(component_count, labels, component_sizes, sources, targets),
+        "scc_size": scc_size,
+    }
+
+
+def calculate_risk_scores(
+    loc: List[int],
+    imported_by_count: List[int],
+    imports_count: List[int],
+    metrics: Optional[Dict[str, list]] = None,
+    model: str = RISK_MODEL
+) -> Tuple[List[float], List[str]]:
+    """
+    Score every file at once.
+
+    The "basic" model is calculate_risk_score; the "graph" model adds
+    PageRank (scaled so the average file scores 1), a term for transitive
+    fan-in and one for each other file in the same import cycle.
+
+    Returns:
+        Risk scores rounded to two decimals and risk levels, aligned with the inputs
+    """
+    use_graph = model == "graph" and metrics is not None
+
+    if np is None:
+        scores = [
+            calculate_risk_score(*counts)
+            for counts in zip(loc, imported_by_count, imports_count)
+        ]
+        if use_graph:
+            node_count = len(scores)
+            scores = [
+                score + 5 * rank * node_count + 0.5 * fan_in + 2 * (cycle - 1)
+                for score, rank, fan_in, cycle in zip(
+                    scores, metrics["pagerank"], metrics["transitive_fan_in"], metrics["scc_size"]
+                )
+            ]
+        return [round(score, 2) for score in scores], [get_risk_level(score) for score in scores]
+
+    scores = (
+        np.asarray(loc, dtype=np.float64) / 10
+        + np.asarray(imported_by_count, dtype=np.float64) * 3
+        + np.asarray(imports_count, dtype=np.float64) * 2
+    )
+    if use_graph:
+        scores += 5 * np.asarray(metrics["pagerank"]) * len(scores)
+        scores += 0.5 * np.asarray(metrics["transitive_fan_in"], dtype=np.float64)
+        scores += 2 * (np.asarray(metrics["scc_size"], dtype=np.float64) - 1)
+
+    # Same thresholds as get_risk_level
+    levels = np.where(scores < 10, "LOW", np.where(scores < 25, "MEDIUM", "HIGH"))
+    return np.round(scores, 2).tolist(), levels.tolist()
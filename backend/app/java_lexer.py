@@ -0,0 +1,233 @@
+"""Single-pass Java lexer for LegacyMap."""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# One alternation tokenizes the whole file; comments and literals are consumed
+# whole so nothing inside them is mistaken for code
+TOKEN_PATTERN = re.compile(r'''
+    (?P<newline>\n)
+  | (?P<space>[^\S\n]+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>"""(?:\\.|.)*?(?:"""|\Z)|"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)
+  | (?P<ident>(?:[^\W\d]|\$)[\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<symbol>.)
+''', re.VERBOSE | re.DOTALL)
+
+# Never recorded as declarations or call sites
+CONTROL_KEYWORDS = {"if", "for", "while", "switch", "catch", "synchronized", "try"}
+# Tokens after which "name(...);" is an expression, not an abstract method declaration
+EXPRESSION_KEYWORDS = {"return", "new", "throw", "else", "case", "yield", "assert", "do"}
+TYPE_KEYWORDS = {"class", "interface", "enum"}
+
+
+class JavaSource:
+    """Everything LegacyMap extracts from one Java file."""
+
+    __slots__ = ("loc", "package", "imports", "declarations", "call_sites", "spans")
+
+    def __init__(self):
+        # Non-blank lines
+        self.loc = 0
+        self.package: Optional[str] = None
+        self.imports: List[str] = []
+        # (name, "class" | "function", line) in source order
+        self.declarations: List[Tuple[str, str, int]] = []
+        # called identifier -> line numbers it is called on
+        self.call_sites: Dict[str, List[int]] = {}
+        # method name -> {"start", "end" (exclusive), "calls"} for its first body
+        self.spans: Dict[str, Dict[str, Any]] = {}
+
+
+def _qualified_name(values: List[str], start: int) -> Tuple[str, int]:
+    """Read a dotted name (optionally ending in .*) starting at a token index."""
+    parts = []
+    i = start
+    n = len(values)
+    while i < n:
+        value = values[i]
+        if value == "." or value == "*" or (value[0].isalpha() or value[0] in "_$"):
+            parts.append(value)
+            i += 1
+        else:
+            break
+    return "".join(parts), i
+
+
+def lex_java(content: str) -> JavaSource:
+    """
+    Tokenize a Java file once and derive LOC, package, imports, class and
+    method declarations with body spans, and call sites from the tokens.
+    """
+    source = JavaSource()
+    kinds: List[str] = []
+    values: List[str] = []
+    lines: List[int] = []
+    nonblank = set()
+    line = 1
+
+    for match in TOKEN_PATTERN.finditer(content):
+        kind = match.lastgroup
+        if kind == "newline":
+            line += 1
+            continue
+        if kind == "space":
+            continue
+
+        value = match.group()
+        if "\n" in value:
+            # Comments and text blocks spanning lines count every non-blank line they cover
+            segments = value.split("\n")
+            for offset, segment in enumerate(segments):
+                if segment.strip():
+                    nonblank.add(line + offset)
+            token_line = line
+            line += len(segments) - 1
+        else:
+            nonblank.add(line)
+            token_line = line
+
+        if kind != "comment":
+            kinds.append(kind)
+            values.append(value)
+            lines.append(token_line)
+
+    source.loc = len(nonblank)
+
+    # Match brackets so declarations and bodies can be found without rescanning
+    n = len(values)
+    matching = [-1] * n
+    open_parens: List[int] = []
+    open_braces: List[int] = []
+    for i, value in enumerate(values):
+        if kinds[i] != "symbol":
+            continue
+        if value == "(":
+            open_parens.append(i)
+        elif value == ")" and open_parens:
+            matching[open_parens.pop()] = i
+        elif value == "{":
+            open_braces.append(i)
+        elif value == "}" and open_braces:
+            matching[open_braces.pop()] = i
+
+    imports = set()
+    call_names: List[str] = []
+    call_positions: List[int] = []
+    call_sites = source.call_sites
+    bodies: List[Tuple[str, int, int]] = []
+    depth = 0
+    # Indexes of the "{" enclosing the current token, innermost last
+    enclosing: List[int] = []
+    # "{" of each record body -> the record's name, for compact constructors
+    record_bodies: Dict[int, str] = {}
+    # Last token of a name that is neither a declaration nor a call: an annotation or a record header
+    skip_until = -1
+
+    for i in range(n):
+        kind = kinds[i]
+        value = values[i]
+
+        if kind == "symbol":
+            if value == "{":
+                depth += 1
+                enclosing.append(i)
+            elif value == "}":
+                depth -= 1
+                if enclosing:
+                    enclosing.pop()
+            continue
+        if kind != "ident":
+            continue
+
+        previous = values[i - 1] if i > 0 else ""
+        following = values[i + 1] if i + 1 < n else ""
+
+        if depth == 0 and value == "package" and source.package is None:
+            source.package, _ = _qualified_name(values, i + 1)
+            continue
+        if depth == 0 and value == "import":
+            start = i + 2 if following == "static" else i + 1
+            name, end = _qualified_name(values, start)
+            if name and end < n and values[end] == ";":
+                imports.add(name)
+            continue
+
+        if previous != "." and i + 1 < n and kinds[i + 1] == "ident":
+            is_record = value == "record" and i + 2 < n and values[i + 2] in ("(", "<")
+            if value in TYPE_KEYWORDS or is_record:
+                source.declarations.append((following, "class", lines[i + 1]))
+                if is_record:
+                    # The header R(...) is not a call, and "R {" in the body is a compact constructor
+                    header = i + 2
+                    while header < n and values[header] != "(":
+                        header += 1
+                    body = matching[header] if header < n else -1
+                    while body != -1 and body < n and values[body] != "{":
+                        body += 1
+                    if body != -1 and body < n:
+                        record_bodies[body] = following
+                    skip_until = i + 1
+                continue
+
+        if previous == "@":
+            # @a.b.Name(...) is an annotation, not a call of Name
+            skip_until = i
+            while skip_until + 2 < n and values[skip_until + 1] == "." and kinds[skip_until + 2] == "ident":
+                skip_until += 2
+        if i <= skip_until:
+            continue
+
+        if following == "{" and enclosing and record_bodies.get(enclosing[-1]) == value:
+            # Compact record constructor
+            source.declarations.append((value, "function", lines[i]))
+            bodies.append((value, i, matching[i + 1] if matching[i + 1] != -1 else n - 1))
+            continue
+
+        if following != "(" or value in CONTROL_KEYWORDS:
+            continue
+
+        # name(...) [throws ...] followed by { or ; may be a declaration
+        close = matching[i + 1]
+        after = close + 1 if close != -1 else n
+        if after < n and values[after] == "throws":
+            while after < n and values[after] not in ("{", ";"):
+                after += 1
+        terminator = values[after] if after < n else ""
+
+        if previous not in (".", "new") and previous != "record" and terminator == "{":
+            source.declarations.append((value, "function", lines[i]))
+            bodies.append((value, i, matching[after] if matching[after] != -1 else n - 1))
+            continue
+        if terminator == ";" and previous not in EXPRESSION_KEYWORDS and (
+            previous in (">", "]") or (i > 0 and kinds[i - 1] == "ident")
+        ):
+            # Abstract or interface method
+            source.declarations.append((value, "function", lines[i]))
+            continue
+
+        sites = call_sites.get(value)
+        if sites is None:
+            call_sites[value] = [lines[i]]
+        elif sites[-1] != lines[i]:
+            sites.append(lines[i])
+        call_names.append(value)
+        call_positions.append(i)
+
+    source.imports = sorted(imports)
+
+    for name, start, end in bodies:
+        if name in source.spans:
+            continue
+        first = bisect_left(call_positions, start)
+        last = bisect_right(call_positions, end)
+        source.spans[name] = {
+            "start": lines[start],
+            "end": lines[end] + 1,
+            "calls": sorted(set(call_names[first:last])),
+        }
+
+    return source
@@ -0,0 +1,233 @@
+"""Background analysis jobs for LegacyMap."""
+
+import os
+import time
+import uuid
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+
+# Analyses that run at once, and how many more may wait for a worker
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_QUEUE_LIMIT = int(os.getenv("ANALYSIS_QUEUE_LIMIT", "8"))
+# Seconds a finished job stays available for status polling
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+# Least seconds between progress updates written to a shared backend
+JOB_PUBLISH_INTERVAL_SECONDS = float(os.getenv("JOB_PUBLISH_INTERVAL_SECONDS", "1"))
+
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a running analysis when its job has been cancelled."""
+
+
+class QueueFull(Exception):
+    """Raised when no more analysis jobs can be queued."""
+
+
+class AnalysisJob:
+    """Status and progress of one background analysis."""
+
+    def __init__(self):
+        self.job_id = str(uuid.uuid4())
+        self.status = "queued"
+        self.phase = "queued"
+        self.files_scanned = 0
+        self.files_total = 0
+        self.repo_id: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        # Resolved with the final status once the job has finished
+        self.done: Future = Future()
+        # time.monotonic() of the last state written to the backend
+        self.published_at = 0.0
+        # Called after each progress update so other processes can follow the job
+        self.on_progress: Optional[Callable[["AnalysisJob"], None]] = None
+
+    def update_progress(self, phase: str, files_scanned: int = 0, files_total: int = 0):
+        """
+        Record scanner progress; used as CodeScanner's progress callback.
+
+        Raises JobCancelled once the job has been cancelled so the scan stops.
+        """
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        self.phase = phase
+        self.files_scanned = files_scanned
+        if files_total:
+            self.files_total = files_total
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+    async def wait(self):
+        """Wait on the event loop until the job has finished, without polling."""
+        # Shielded, so a waiter going away does not cancel (and so resolve) the job's future
+        await asyncio.shield(asyncio.wrap_future(self.done))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the public status of the job."""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "phase": self.phase,
+            "files_scanned": self.files_scanned,
+            "files_total": self.files_total,
+            "repo_id": self.repo_id,
+            "error": self.error,
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """Get everything needed to show the job from another process."""
+        return {**self.to_dict(), "created_at": self.created_at, "finished_at": self.finished_at}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "AnalysisJob":
+        """Rebuild a read-only view of a job from to_state output."""
+        job = cls()
+        for name, value in state.items():
+            setattr(job, name, value)
+        return job
+
+
+class JobManager:
+    """
+    Run analyses on a bounded thread pool and track their status.
+
+    Job states are also written to the analysis backend, so with a shared
+    backend any worker process can report on (and cancel) a job running in
+    another one.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = ANALYSIS_WORKERS,
+        queue_limit: int = ANALYSIS_QUEUE_LIMIT,
+        backend: Optional[Any] = None
+    ):
+        """
+        Args:
+            max_workers: Analyses that run at once
+            queue_limit: Analyses that may wait for a worker
+            backend: FileBackend or SQLiteBackend from analysis_store; jobs stay local if None
+        """
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.jobs: Dict[str, AnalysisJob] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, func: Callable[[AnalysisJob], str]) -> AnalysisJob:
+        """
+        Queue an analysis.
+
+        Args:
+            func: Runs the analysis for a job and returns the repo_id it was cached under
+
+        Raises:
+            QueueFull: If every worker is busy and the queue is at its limit
+        """
+        with self.lock:
+            self._prune()
+            active = sum(1 for job in self.jobs.values() if job.status not in FINISHED_STATUSES)
+            if active >= self.max_workers + self.queue_limit:
+                raise QueueFull()
+
+            job = AnalysisJob()
+            job.on_progress = self._publish_progress
+            self.jobs[job.job_id] = job
+
+        self._publish(job)
+        self.executor.submit(self._run, job, func)
+        return job
+
+    def add_completed(self, repo_id: str) -> AnalysisJob:
+        """Record a job that finished without running, e.g. answered from a cached analysis."""
+        job = AnalysisJob()
+        job.repo_id = repo_id
+        job.phase = "done"
+        self._finish(job, "completed")
+        with self.lock:
+            self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """Get a job by id, from this process or as last published by another one."""
+        job = self.jobs.get(job_id)
+        if job is None and self.backend is not None:
+            state = self.backend.load_job(job_id)
+            if state is not None:
+                job = AnalysisJob.from_state(state)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        """Request cancellation of a job; queued jobs never start, running ones stop at the next file."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            # Owned by another process, which picks the request up at its next progress update
+            job = self.get(job_id)
+            if job is not None and job.status not in FINISHED_STATUSES:
+                self.backend.request_cancel(job_id)
+            return job
+        if job.status not in FINISHED_STATUSES:
+            job.cancel_event.set()
+            if job.status == "queued":
+                self._finish(job, "cancelled")
+        return job
+
+    def _run(self, job: AnalysisJob, func: Callable[[AnalysisJob], str]):
+        # A job cancelled while queued still runs func, which stops at its first
+        # progress report and gets the chance to clean up after itself
+        if not job.cancel_event.is_set():
+            job.status = "running"
+            self._publish(job)
+        try:
+            job.repo_id = func(job)
+            job.phase = "done"
+            self._finish(job, "completed")
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            print(f"Error analyzing file: {e}")
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _finish(self, job: AnalysisJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        self._publish(job)
+        try:
+            job.done.set_result(status)
+        except InvalidStateError:
+            # A queued job is finished when cancelled, and again when its worker gets to it
+            pass
+
+    def _publish(self, job: AnalysisJob):
+        if self.backend is not None:
+            job.published_at = time.monotonic()
+            self.backend.save_job(job.to_state())
+
+    def _publish_progress(self, job: AnalysisJob):
+        """Publish progress at most every JOB_PUBLISH_INTERVAL_SECONDS and pick up remote cancellation."""
+        if self.backend is None:
+            return
+        if time.monotonic() - job.published_at < JOB_PUBLISH_INTERVAL_SECONDS:
+            return
+        if self.backend.cancel_requested(job.job_id):
+            job.cancel_event.set()
+        self._publish(job)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        if self.backend is not None:
+            self.backend.prune_jobs(cutoff)
+        for job_id in [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self.jobs[job_id]
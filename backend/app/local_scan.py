@@ -0,0 +1,94 @@
+"""
+Analysis of directories on the server, e.g. repositories CI has already checked out.
+
+Run from the backend directory to analyze a directory into the shared
+analysis store, so the API serves it without an upload:
+
+    python -m app.local_scan /srv/checkouts/project --output analysis.json
+
+Each directory keeps one repo_id; running again parses only the files that
+changed since the last run.
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List, Any, Optional
+
+
+# Directories, separated by os.pathsep, under which /analyze-directory may scan;
+# empty disables the endpoint
+LOCAL_SCAN_ROOTS = [
+    os.path.realpath(root)
+    for root in os.getenv("LOCAL_SCAN_ROOTS", "").split(os.pathsep)
+    if root.strip()
+]
+
+
+class PathNotAllowed(Exception):
+    """Raised when a directory is outside every allow-listed root."""
+
+
+def resolve_local_path(path: str, roots: Optional[List[str]] = None) -> str:
+    """
+    Resolve a directory to scan and check it against the allow-list.
+
+    Symlinks are resolved first, so a link inside an allowed root cannot
+    point the scanner outside of it.
+
+    Args:
+        path: Directory requested
+        roots: Allowed roots; LOCAL_SCAN_ROOTS by default
+
+    Raises:
+        PathNotAllowed: If the directory is not inside one of the roots
+        NotADirectoryError: If it is not an existing directory
+    """
+    roots = LOCAL_SCAN_ROOTS if roots is None else roots
+    real_path = os.path.realpath(path)
+    if not any(os.path.commonpath([real_path, root]) == root for root in roots):
+        raise PathNotAllowed(path)
+    if not os.path.isdir(real_path):
+        raise NotADirectoryError(path)
+    return real_path
+
+
+def source_key(directory: str) -> str:
+    """Key under which a directory's repo_id is recorded, alongside uploaded archive hashes."""
+    return f"directory:{directory}"
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Directory to analyze")
+    parser.add_argument("--full", action="store_true",
+                        help="Parse every file again instead of only those changed since the last run")
+    parser.add_argument("--output", help="Also write the whole analysis to this JSON file")
+    args = parser.parse_args(argv)
+
+    directory = os.path.realpath(args.path)
+    if not os.path.isdir(directory):
+        parser.error(f"{args.path} is not a directory")
+
+    # Imported here: the API module opens the shared stores this command writes to
+    from .main import analyze_directory, analysis_cache
+    from .analysis_store import dump_analysis
+
+    repo_id = analyze_directory(directory, full=args.full)
+    results = analysis_cache[repo_id]
+    report = {
+        "repo_id": repo_id,
+        "summary": results["summary"],
+        "counts": results.get("timings", {}).get("counts", {}),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(dump_analysis(results))
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,14 +2,60 @@
 
 import os
 import uuid
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import time
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, AsyncIterator, Iterable, Tuple
+from fastapi import FastAPI, HTTPException, Query, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
 import tempfile
+import zipfile
+import aiofiles
 
 from .scanner import CodeScanner
-from .ai_summary import generate_summary
+from .symbol_index import SymbolIndex
+from .call_graph import CallGraph, DIRECTIONS
+from .file_graph import FileGraph, MAX_NEIGHBORHOOD_NODES
+from .graph_coarsening import CoarseGraph, MAX_EXPANDED_FILES, COARSE_GRAPHS_PER_REPO
+from .jobs import AnalysisJob, JobManager, QueueFull, FINISHED_STATUSES
+from .result_cache import get_result_cache
+from .analysis_store import AnalysisCache, get_analysis_backend
+from .content_store import ContentStore, CONTENT_STORE_DIR
+from .analysis_index import AnalysisIndex, SORT_KEYS
+from .function_table import FunctionTable
+from .columnar import to_columnar, wants_columnar, FastJSONResponse, ColumnarResponse
+from .metrics import Registry, Counter, Gauge, Histogram, server_timing
+from .ai_summary import SummaryService
+from .streaming import (
+    NDJSON_MEDIA_TYPE, RecordStream, encode_line, file_record, file_records, result_records
+)
+from .uploads import receive_upload, UploadTooLarge, InvalidUpload, MULTIPART_OVERHEAD_BYTES
+from .local_scan import LOCAL_SCAN_ROOTS, PathNotAllowed, resolve_local_path, source_key
+
+
+class FunctionRef(BaseModel):
+    """A function to look up, by file path and name."""
+    file: str
+    function: str
+
+
+class FunctionDetailsBatchRequest(BaseModel):
+    """Body of POST /function-details/{repo_id}/batch."""
+    functions: List[FunctionRef]
+
+
+class DirectoryAnalysisRequest(BaseModel):
+    """Body of POST /analyze-directory."""
+    path: str
+    # Parse every file again instead of only those changed since the last analysis
+    full: bool = False
 
 
 # Create FastAPI app
@@ -33,8 +79,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store analysis results in memory (in production, use a database)
-analysis_cache: Dict[str, Dict[str, Any]] = {}
+# Call-site indexes built during each scan, keyed like analysis_cache
+symbol_index_cache: Dict[str, SymbolIndex] = {}
+
+# Function-level call graphs built during each scan, keyed like analysis_cache
+call_graph_cache: Dict[str, CallGraph] = {}
+
+# Dependency graph adjacency lists built during each scan, keyed like analysis_cache
+file_graph_cache: Dict[str, FileGraph] = {}
+
+# Coarsened dependency graphs, keyed by repo_id and then by grouping options,
+# least recently used first
+coarse_graph_cache: "Dict[str, OrderedDict[tuple, CoarseGraph]]" = {}
+coarse_graph_lock = threading.Lock()
+
+# Sorted and filtered file orderings for paginated /analysis queries, built on first use
+analysis_index_cache: Dict[str, AnalysisIndex] = {}
+
+
+def drop_indexes(repo_id: str):
+    """Forget the in-memory indexes and close the content store of an analysis."""
+    # A request still reading the store maps it again on demand
+    content_store = content_stores.pop(repo_id, None)
+    if content_store is not None:
+        content_store.close()
+    symbol_index_cache.pop(repo_id, None)
+    call_graph_cache.pop(repo_id, None)
+    file_graph_cache.pop(repo_id, None)
+    coarse_graph_cache.pop(repo_id, None)
+    analysis_index_cache.pop(repo_id, None)
+
+
+# Persistent store of analyses, call-site indexes, archive hashes and job states,
+# shared by every worker process on this host
+analysis_backend = get_analysis_backend()
+
+# Store analysis results in memory within a budget over the backend; analyses
+# evicted from memory are loaded back, with their indexes, on demand
+analysis_cache = AnalysisCache(backend=analysis_backend, on_evict=drop_indexes)
+
+# Source content of each analysis, kept out of the results and opened on demand
+content_stores: Dict[str, ContentStore] = {}
+
+# Per-file results shared by every scan, so unchanged files are not parsed again
+result_cache = get_result_cache()
+
+# Uploads are streamed to disk in chunks; MAX_UPLOAD_BYTES=0 disables the size limit
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+# Largest number of functions a single /function-details batch may ask for
+MAX_BATCH_FUNCTIONS = int(os.getenv("MAX_BATCH_FUNCTIONS", "5000"))
+
+# Bounds on /call-graph impact traversals
+MAX_IMPACT_DEPTH = int(os.getenv("MAX_IMPACT_DEPTH", "10"))
+MAX_IMPACT_NODES = int(os.getenv("MAX_IMPACT_NODES", "10000"))
+
+# One lock per directory, so repeat analyses of a directory in this process do not interleave
+directory_locks: Dict[str, threading.Lock] = {}
+directory_locks_lock = threading.Lock()
+
+# Background analyses started by /upload-analyze
+job_manager = JobManager(backend=analysis_backend)
+
+# AI summaries from Ollama, cached and shared between concurrent requests
+summary_service = SummaryService()
+
+# Metrics served by /metrics
+metrics_registry = Registry()
+analysis_duration = metrics_registry.register(Histogram(
+    "legacymap_analysis_duration_seconds", "Wall-clock time of completed analyses"
+))
+analysis_phase_duration = metrics_registry.register(Histogram(
+    "legacymap_analysis_phase_seconds", "Time spent in each phase of completed analyses"
+))
+analyzed_files = metrics_registry.register(Counter(
+    "legacymap_analyzed_files_total", "Files analyzed"
+))
+analyzed_bytes = metrics_registry.register(Counter(
+    "legacymap_analyzed_bytes_total", "Bytes of source analyzed"
+))
+result_cache_lookups = metrics_registry.register(Counter(
+    "legacymap_result_cache_lookups_total", "Per-file result cache lookups by result (hit or miss)"
+))
+archive_cache_lookups = metrics_registry.register(Counter(
+    "legacymap_archive_cache_lookups_total", "Uploads answered from an earlier identical upload (hit) or scanned (miss)"
+))
+metrics_registry.register(Gauge(
+    "legacymap_analysis_cache_bytes", "Estimated memory held by analyses in analysis_cache",
+    lambda: analysis_cache.total_bytes
+))
+metrics_registry.register(Gauge(
+    "legacymap_analysis_cache_entries", "Analyses held in memory by analysis_cache",
+    lambda: len(analysis_cache)
+))
+metrics_registry.register(Gauge(
+    "legacymap_active_jobs", "Analysis jobs queued or running",
+    lambda: sum(1 for job in list(job_manager.jobs.values()) if job.status not in FINISHED_STATUSES)
+))
 
 
 @app.get("/")
@@ -53,67 +195,569 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.post("/upload-analyze")
-async def upload_and_analyze(file: UploadFile = File(...)):
+async def save_upload(request: Request, destination: str) -> Tuple[str, str]:
     """
-    Upload a ZIP file and analyze the code.
-    
-    Args:
-        file: ZIP file containing code to analyze
+    Stream the "file" field of a multipart upload to disk as it is received.
     
     Returns:
-        Analysis results including files, functions, and dependencies
+        Filename of the upload and SHA-256 hex digest of its content,
+        computed while streaming
+    
+    Raises:
+        HTTPException: 413 before reading the body if its Content-Length is
+            over MAX_UPLOAD_BYTES, or as soon as that many bytes have been
+            received; 400 if it is not a multipart upload with a file
     """
-    # Validate file type
-    if not file.filename.endswith('.zip'):
-        raise HTTPException(
-            status_code=400,
-            detail="Only ZIP files are supported"
+    content_length = request.headers.get("content-length")
+    if MAX_UPLOAD_BYTES and content_length and content_length.isdigit() and (
+        int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    ):
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit")
+    
+    try:
+        return await receive_upload(
+            request.stream(),
+            request.headers.get("content-type"),
+            destination,
+            max_bytes=MAX_UPLOAD_BYTES,
+            chunk_size=UPLOAD_CHUNK_SIZE
         )
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit")
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def load_analysis(repo_id: str, detail: str = "Analysis not found") -> Dict[str, Any]:
+    """
+    Get a cached analysis from a worker thread, so loading it back from the
+    backend does not block the event loop.
     
-    # Save uploaded file to temp location
-    temp_file = None
+    Raises:
+        HTTPException: 404 if there is no analysis under repo_id
+    """
+    analysis = await run_in_threadpool(analysis_cache.get, repo_id)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return analysis
+
+
+def get_content_store(repo_id: str) -> Optional[ContentStore]:
+    """Get the content store of an analysis, opening it from disk if needed."""
+    content_store = content_stores.get(repo_id)
+    if content_store is not None and not os.path.exists(f"{content_store.path}.json"):
+        # Deleted through another worker process
+        content_stores.pop(repo_id, None)
+        content_store.close()
+        content_store = None
+    if content_store is None:
+        content_store = ContentStore.open(os.path.join(CONTENT_STORE_DIR, os.path.basename(repo_id)))
+        if content_store is not None:
+            content_stores[repo_id] = content_store
+    return content_store
+
+
+def get_symbol_index(repo_id: str, files_data: List[Dict[str, Any]], scanner: CodeScanner) -> SymbolIndex:
+    """Get the call-site index of an analysis, loading or rebuilding it if it was evicted."""
+    symbol_index = symbol_index_cache.get(repo_id)
+    if symbol_index is None:
+        stored = analysis_backend.load_index(repo_id, "symbol_index")
+        if stored is not None:
+            symbol_index = SymbolIndex.from_dict(stored)
+        else:
+            # The analysis was loaded back without its index
+            symbol_index = scanner.build_symbol_index(files_data, get_content_store(repo_id))
+            analysis_backend.save_index(repo_id, "symbol_index", symbol_index.to_dict())
+        symbol_index_cache[repo_id] = symbol_index
+    return symbol_index
+
+
+def get_call_graph(repo_id: str, analysis: Dict[str, Any], scanner: CodeScanner) -> CallGraph:
+    """Get the call graph of an analysis, rebuilding it if it was evicted."""
+    call_graph = call_graph_cache.get(repo_id)
+    if call_graph is None:
+        symbol_index = get_symbol_index(repo_id, analysis.get("files", []), scanner)
+        call_graph = CallGraph.build(
+            symbol_index,
+            analysis.get("dependency_graph", {}).get("edges", []),
+            scanner.function_extractor.call_keywords
+        )
+        call_graph_cache[repo_id] = call_graph
+    return call_graph
+
+
+def get_file_graph(repo_id: str, analysis: Dict[str, Any]) -> FileGraph:
+    """Get the dependency graph adjacency lists of an analysis, rebuilding them if evicted."""
+    file_graph = file_graph_cache.get(repo_id)
+    if file_graph is None:
+        file_graph = FileGraph(
+            [file_data["path"] for file_data in analysis.get("files", [])],
+            analysis.get("dependency_graph", {}).get("edges", [])
+        )
+        file_graph_cache[repo_id] = file_graph
+    return file_graph
+
+
+def get_coarse_graph(
+    repo_id: str,
+    analysis: Dict[str, Any],
+    group_by: str,
+    depth: Optional[int],
+    collapse_cycles: bool
+) -> CoarseGraph:
+    """
+    Get a coarsened dependency graph of an analysis, building it on first use.
+    
+    Depths past the deepest group share the graph built without a depth, and
+    only the COARSE_GRAPHS_PER_REPO most recently used graphs are kept.
+    """
+    with coarse_graph_lock:
+        graphs = coarse_graph_cache.setdefault(repo_id, OrderedDict())
+        full_graph = graphs.get((group_by, None, collapse_cycles))
+        if depth is not None and full_graph is not None and depth >= full_graph.max_depth:
+            depth = None
+        key = (group_by, depth, collapse_cycles)
+        coarse_graph = graphs.get(key)
+        if coarse_graph is not None:
+            graphs.move_to_end(key)
+            return coarse_graph
+    
+    coarse_graph = CoarseGraph(
+        analysis.get("files", []),
+        analysis.get("dependency_graph", {}).get("edges", []),
+        group_by,
+        depth,
+        collapse_cycles
+    )
+    if depth is not None and depth >= coarse_graph.max_depth:
+        key = (group_by, None, collapse_cycles)
+    with coarse_graph_lock:
+        graphs = coarse_graph_cache.setdefault(repo_id, OrderedDict())
+        graphs[key] = coarse_graph
+        graphs.move_to_end(key)
+        while len(graphs) > COARSE_GRAPHS_PER_REPO:
+            graphs.popitem(last=False)
+    return coarse_graph
+
+
+def cache_analysis(repo_id: str, results: Dict[str, Any], scanner: CodeScanner, started: float):
+    """Cache the results and indexes of a finished scan under repo_id and record its metrics."""
+    results["repo_id"] = repo_id
+    
+    # Indexes of an earlier analysis under the same repo_id are stale
+    drop_indexes(repo_id)
+    
+    scanner.content_store.move_to(os.path.join(CONTENT_STORE_DIR, repo_id))
+    content_stores[repo_id] = scanner.content_store
+    symbol_index_cache[repo_id] = scanner.symbol_index
+    call_graph_cache[repo_id] = scanner.call_graph
+    file_graph_cache[repo_id] = scanner.file_graph
+    analysis_cache[repo_id] = results
+    analysis_backend.save_index(repo_id, "symbol_index", scanner.symbol_index.to_dict())
+    
+    analysis_duration.observe(time.perf_counter() - started)
+    for phase, seconds in scanner.timings.items():
+        analysis_phase_duration.observe(seconds, phase=phase)
+    counts = scanner.counts
+    analyzed_files.inc(counts.get("files", 0))
+    analyzed_bytes.inc(counts.get("bytes", 0))
+    if result_cache is not None:
+        # Files carried over by an incremental rescan were never looked up
+        looked_up = counts.get("files", 0) - counts.get("unchanged", 0)
+        result_cache_lookups.inc(counts.get("cache_hits", 0), result="hit")
+        result_cache_lookups.inc(looked_up - counts.get("cache_hits", 0), result="miss")
+    
+    prune_analyses()
+
+
+def run_analysis(
+    job: AnalysisJob,
+    zip_path: str,
+    content_hash: str,
+    record_stream: Optional[RecordStream] = None
+) -> str:
+    """
+    Analyze an uploaded ZIP for a background job and cache the results.
+    
+    When record_stream is given, a "file" record is sent to it as each file
+    is scanned, and the stream is finished when the analysis ends.
+    """
     try:
-        # Create temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        # Analyze the ZIP file
-        scanner = CodeScanner()
-        results = scanner.analyze_zip(temp_file_path)
+        started = time.perf_counter()
+        file_callback = None
+        if record_stream is not None:
+            # A cancelled job stops waiting on its client
+            record_stream.cancel_event = job.cancel_event
+            file_callback = lambda file_data, functions: record_stream.put(file_record(file_data, functions))
+        scanner = CodeScanner(
+            progress_callback=job.update_progress,
+            result_cache=result_cache,
+            content_store_dir=CONTENT_STORE_DIR,
+            file_callback=file_callback,
+        )
+        results = scanner.analyze_zip(zip_path)
         
         # Generate unique repo ID
         repo_id = str(uuid.uuid4())
         
         # Cache results
-        analysis_cache[repo_id] = results
+        cache_analysis(repo_id, results, scanner, started)
+        analysis_backend.set_archive(content_hash, repo_id)
+        
+        return repo_id
+    
+    finally:
+        if record_stream is not None:
+            record_stream.finish()
+        # Cleanup temp file
+        try:
+            os.unlink(zip_path)
+        except OSError:
+            pass
+
+
+def analyze_directory(
+    directory: str,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    full: bool = False
+) -> str:
+    """
+    Analyze a directory on this host and cache the results.
+    
+    Every directory keeps one repo_id. If it was analyzed before, only the
+    files changed since are parsed and the analysis is updated in place.
+    
+    Args:
+        directory: Resolved path of the directory
+        progress_callback: CodeScanner progress callback
+        full: Parse every file again even if a manifest of the last analysis exists
+    
+    Returns:
+        The repo_id of the analysis
+    """
+    with directory_locks_lock:
+        lock = directory_locks.setdefault(directory, threading.Lock())
+    
+    with lock:
+        started = time.perf_counter()
+        scanner = CodeScanner(
+            progress_callback=progress_callback,
+            result_cache=result_cache,
+            content_store_dir=CONTENT_STORE_DIR,
+        )
+        repo_id = analysis_backend.get_archive(source_key(directory))
+        previous = analysis_cache.get(repo_id) if repo_id is not None else None
+        manifest = None
+        if previous is not None and not full:
+            manifest = analysis_backend.load_index(repo_id, "manifest")
         
-        # Add repo_id to response
-        results["repo_id"] = repo_id
+        if manifest is not None:
+            results = scanner.rescan_directory(
+                directory,
+                previous,
+                manifest,
+                get_symbol_index(repo_id, previous.get("files", []), scanner),
+                get_content_store(repo_id)
+            )
+        else:
+            results = scanner.scan_directory(directory)
+            if previous is None:
+                repo_id = str(uuid.uuid4())
         
-        return JSONResponse(content=results)
+        cache_analysis(repo_id, results, scanner, started)
+        analysis_backend.save_index(repo_id, "manifest", scanner.manifest)
+        analysis_backend.set_archive(source_key(directory), repo_id)
+        return repo_id
+
+
+def remove_analysis(repo_id: str) -> bool:
+    """
+    Delete an analysis with its indexes and source content.
+    
+    Returns:
+        False if there was no analysis under repo_id
+    """
+    try:
+        del analysis_cache[repo_id]
+    except KeyError:
+        return False
+    drop_indexes(repo_id)
+    content_store = get_content_store(repo_id)
+    if content_store is not None:
+        content_store.delete()
+        content_stores.pop(repo_id, None)
+    return True
+
+
+def content_store_bytes(repo_id: str) -> int:
+    """Get the bytes the source content of an analysis takes on disk."""
+    return ContentStore.disk_size(os.path.join(CONTENT_STORE_DIR, os.path.basename(repo_id)))
+
+
+def prune_analyses():
+    """Delete the least recently used analyses once stored data passes ANALYSIS_STORE_MAX_BYTES."""
+    for repo_id in analysis_cache.select_pruned(extra_bytes=content_store_bytes):
+        remove_analysis(repo_id)
+
+
+async def stream_analysis(
+    job: AnalysisJob,
+    content_hash: str,
+    records: Iterable[Dict[str, Any]] = (),
+    record_stream: Optional[RecordStream] = None
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON body of a streamed /upload-analyze.
     
-    except zipfile.BadZipFile:
+    A "job" record comes first, then a "file" record per file (live from
+    record_stream while the scan runs, or from records), then the
+    dependency edges, per-file scores and summary of the finished analysis.
+    If the analysis does not complete, an "error" record ends the stream.
+    """
+    try:
+        yield encode_line({"type": "job", **job.to_dict(), "sha256": content_hash})
+        for record in records:
+            yield encode_line(record)
+        if record_stream is not None:
+            async for record in record_stream.records():
+                yield encode_line(record)
+        
+        # The job is marked finished just after its stream is
+        await job.wait()
+        results = None
+        if job.status == "completed":
+            results = await run_in_threadpool(analysis_cache.get, job.repo_id)
+        if results is None:
+            yield encode_line({"type": "error", "status": job.status, "error": job.error})
+            return
+        for record in result_records(results):
+            yield encode_line(record)
+    finally:
+        # The client went away before the analysis finished
+        if job.status not in FINISHED_STATUSES:
+            job_manager.cancel(job.job_id)
+
+
+def end_stream(job: AnalysisJob, record_stream: Optional[RecordStream] = None):
+    """
+    Stop a streamed analysis once its response has ended.
+    
+    Runs as the response's background task, so it also covers a client that
+    went away before the body was started and stream_analysis never ran.
+    """
+    if record_stream is not None:
+        record_stream.cancel()
+    if job.status not in FINISHED_STATUSES:
+        job_manager.cancel(job.job_id)
+
+
+@app.post("/upload-analyze", status_code=202, openapi_extra={
+    # The body is parsed while it streams in, so describe it here instead of with a File parameter
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+})
+async def upload_and_analyze(
+    request: Request,
+    stream: bool = False,
+    accept: Optional[str] = Header(None)
+):
+    """
+    Upload a ZIP file and queue it for analysis.
+    
+    Args:
+        request: Multipart form with the ZIP file containing code to
+            analyze in its ``file`` field
+        stream: Send the analysis as newline-delimited JSON while it runs;
+            also selected by an Accept header of application/x-ndjson
+    
+    Returns:
+        Job status; poll /jobs/{job_id} until it completes, then fetch
+        /analysis/{repo_id}. When streaming, the job status, a record per
+        file as it is scanned, the dependency edges, per-file scores and
+        finally the summary, one JSON object per line.
+    """
+    streaming = stream or (accept is not None and NDJSON_MEDIA_TYPE in accept)
+    
+    # Stream uploaded file to temp location
+    fd, temp_file_path = tempfile.mkstemp(suffix='.zip')
+    os.close(fd)
+    started = time.perf_counter()
+    try:
+        filename, content_hash = await save_upload(request, temp_file_path)
+    except BaseException:
+        os.unlink(temp_file_path)
+        raise
+    
+    # Validate file type
+    if not filename.endswith('.zip'):
+        os.unlink(temp_file_path)
+        raise HTTPException(
+            status_code=400,
+            detail="Only ZIP files are supported"
+        )
+    
+    if not zipfile.is_zipfile(temp_file_path):
+        os.unlink(temp_file_path)
         raise HTTPException(
             status_code=400,
             detail="Invalid ZIP file"
         )
-    except Exception as e:
-        print(f"Error analyzing file: {e}")
+    
+    # Byte-identical to an earlier upload: reuse its analysis without scanning
+    cached_repo_id = analysis_backend.get_archive(content_hash)
+    upload_timing = server_timing({"upload": time.perf_counter() - started})
+    cached = None
+    if cached_repo_id is not None:
+        cached = await run_in_threadpool(analysis_cache.get, cached_repo_id)
+    if cached is not None:
+        os.unlink(temp_file_path)
+        archive_cache_lookups.inc(result="hit")
+        job = job_manager.add_completed(cached_repo_id)
+        if streaming:
+            return StreamingResponse(
+                stream_analysis(job, content_hash, file_records(cached)),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"Server-Timing": upload_timing}
+            )
+        response = job.to_dict()
+        response["sha256"] = content_hash
+        return JSONResponse(status_code=200, content=response, headers={"Server-Timing": upload_timing})
+    archive_cache_lookups.inc(result="miss")
+    
+    record_stream = RecordStream(asyncio.get_running_loop()) if streaming else None
+    try:
+        job = job_manager.submit(lambda job: run_analysis(job, temp_file_path, content_hash, record_stream))
+    except QueueFull:
+        os.unlink(temp_file_path)
         raise HTTPException(
-            status_code=500,
-            detail=f"Error analyzing file: {str(e)}"
+            status_code=429,
+            detail="Too many analyses in progress. Please try again later."
         )
     
-    finally:
-        # Cleanup temp file
-        if temp_file and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+    if streaming:
+        return StreamingResponse(
+            stream_analysis(job, content_hash, record_stream=record_stream),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Server-Timing": upload_timing},
+            background=BackgroundTask(end_stream, job, record_stream)
+        )
+    response = job.to_dict()
+    response["sha256"] = content_hash
+    return JSONResponse(status_code=202, content=response, headers={"Server-Timing": upload_timing})
+
+
+@app.post("/analyze-directory", status_code=202)
+async def analyze_local_directory(request: DirectoryAnalysisRequest):
+    """
+    Queue the analysis of a directory on the server, e.g. a CI checkout.
+    
+    Only directories inside LOCAL_SCAN_ROOTS can be analyzed. Analyzing a
+    directory again keeps its repo_id and only parses the files changed
+    since the last analysis.
+    
+    Returns:
+        Job status; poll /jobs/{job_id} until it completes, then fetch
+        /analysis/{repo_id}
+    """
+    if not LOCAL_SCAN_ROOTS:
+        raise HTTPException(status_code=403, detail="Local directory analysis is disabled")
+    try:
+        directory = resolve_local_path(request.path)
+    except PathNotAllowed:
+        raise HTTPException(status_code=403, detail="Directory is not in an allowed location")
+    except NotADirectoryError:
+        raise HTTPException(status_code=404, detail="Directory not found")
+    
+    try:
+        job = job_manager.submit(lambda job: analyze_directory(directory, job.update_progress, request.full))
+    except QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many analyses in progress. Please try again later."
+        )
+    
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of an analysis job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/progress")
+async def get_job_progress(job_id: str):
+    """Get the current phase and file counts of an analysis job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "phase": job.phase,
+        "files_scanned": job.files_scanned,
+        "files_total": job.files_total,
+    }
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running analysis job."""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.post("/function-details/{repo_id}/batch")
+async def get_function_details_batch(repo_id: str, request: FunctionDetailsBatchRequest):
+    """
+    Get details for many functions at once.
+    
+    Every entry is answered from the analysis' call-site index, which is built
+    in one pass over the code for all names, so a batch costs about one lookup
+    per function rather than one repository scan per function.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        request: (file, function) pairs to look up
+    
+    Returns:
+        Details in request order, with the same shape as /function-details;
+        entries that cannot be found carry an ``error`` instead
+    """
+    if len(request.functions) > MAX_BATCH_FUNCTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_FUNCTIONS} functions can be requested at once"
+        )
+    analysis = await load_analysis(repo_id, "Analysis not found. Please upload and analyze the code first.")
+    files_data = analysis.get("files", [])
+    
+    scanner = CodeScanner()
+    symbol_index = await run_in_threadpool(get_symbol_index, repo_id, files_data, scanner)
+    
+    results = []
+    for ref in request.functions:
+        details = scanner.get_function_details(files_data, ref.file, ref.function, symbol_index)
+        if details is None:
+            details = {
+                "name": ref.function,
+                "file": ref.file,
+                "error": f"Function '{ref.function}' not found in file '{ref.file}'",
+            }
+        results.append(details)
+    
+    return JSONResponse(content={"results": results})
 
 
 @app.get("/function-details/{repo_id}/{file_path:path}/{function_name}")
@@ -130,18 +774,13 @@ async def get_function_details(repo_id: str, file_path: str, function_name: str)
         Function details including call sites and dependencies
     """
     # Get cached analysis
-    if repo_id not in analysis_cache:
-        raise HTTPException(
-            status_code=404,
-            detail="Analysis not found. Please upload and analyze the code first."
-        )
-    
-    analysis = analysis_cache[repo_id]
+    analysis = await load_analysis(repo_id, "Analysis not found. Please upload and analyze the code first.")
     files_data = analysis.get("files", [])
     
     # Create scanner to get function details
     scanner = CodeScanner()
-    details = scanner.get_function_details(files_data, file_path, function_name)
+    symbol_index = await run_in_threadpool(get_symbol_index, repo_id, files_data, scanner)
+    details = scanner.get_function_details(files_data, file_path, function_name, symbol_index)
     
     if not details:
         raise HTTPException(
@@ -152,48 +791,362 @@ async def get_function_details(repo_id: str, file_path: str, function_name: str)
     return JSONResponse(content=details)
 
 
+@app.get("/call-graph/{repo_id}/impact")
+async def get_call_graph_impact(
+    repo_id: str,
+    file: str,
+    function: str,
+    direction: str = Query("both", pattern="^(upstream|downstream|both)$"),
+    depth: int = Query(3, ge=1),
+    limit: int = Query(1000, ge=1),
+):
+    """
+    Get the transitive impact of a function from the call graph.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        file: Path to file containing the function
+        function: Name of the function
+        direction: upstream (callers), downstream (callees) or both
+        depth: Largest number of call hops to follow
+        limit: Largest number of functions to return per direction
+    
+    Returns:
+        Functions reached in each direction with their distance in hops
+    """
+    analysis = await load_analysis(repo_id, "Analysis not found. Please upload and analyze the code first.")
+    if depth > MAX_IMPACT_DEPTH or limit > MAX_IMPACT_NODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"depth must be at most {MAX_IMPACT_DEPTH} and limit at most {MAX_IMPACT_NODES}"
+        )
+    
+    call_graph = await run_in_threadpool(get_call_graph, repo_id, analysis, CodeScanner())
+    node = call_graph.get_id(file, function)
+    if node is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Function '{function}' not found in file '{file}'"
+        )
+    
+    response = {"file": file, "function": function, "depth": depth, "truncated": False}
+    for name in DIRECTIONS:
+        if direction not in (name, "both"):
+            continue
+        reached, truncated = call_graph.traverse(node, name, depth, limit)
+        response[name] = [
+            {"file": call_graph.functions[i][0], "name": call_graph.functions[i][1], "depth": hops}
+            for i, hops in reached
+        ]
+        response["truncated"] = response["truncated"] or truncated
+    
+    return JSONResponse(content=response)
+
+
+@app.get("/graph/{repo_id}/neighborhood")
+async def get_graph_neighborhood(
+    repo_id: str,
+    file: str,
+    depth: int = Query(1, ge=0),
+    direction: str = Query("both", pattern="^(in|out|both)$"),
+    limit: int = Query(MAX_NEIGHBORHOOD_NODES, ge=1, le=MAX_NEIGHBORHOOD_NODES),
+):
+    """
+    Get the part of the dependency graph around one file.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        file: Path of the file at the center
+        depth: Largest number of hops from the file
+        direction: out (files it imports), in (files importing it) or both
+        limit: Largest number of files to return, the center included
+    
+    Returns:
+        Files within ``depth`` hops with their distance and risk, and the
+        dependency edges among them
+    """
+    analysis = await load_analysis(repo_id)
+    file_graph = await run_in_threadpool(get_file_graph, repo_id, analysis)
+    node = file_graph.get_id(file)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"File '{file}' not found")
+    
+    hops, edges, truncated = file_graph.neighborhood(node, depth, direction, limit)
+    files = analysis.get("files", [])
+    return JSONResponse(content={
+        "file": file,
+        "depth": depth,
+        "direction": direction,
+        "truncated": truncated,
+        "nodes": [
+            {
+                "path": files[i]["path"],
+                "depth": distance,
+                "language": files[i].get("language"),
+                "loc": files[i].get("loc", 0),
+                "risk_score": files[i].get("risk_score", 0),
+                "risk_level": files[i].get("risk_level"),
+            }
+            for i, distance in hops.items()
+        ],
+        "edges": [[files[source]["path"], files[target]["path"]] for source, target in edges],
+    })
+
+
+@app.get("/graph/{repo_id}/coarse")
+async def get_coarse_graph_view(
+    repo_id: str,
+    group_by: str = Query("package", pattern="^(package|directory)$"),
+    depth: Optional[int] = Query(None, ge=1),
+    collapse_cycles: bool = True,
+):
+    """
+    Get the dependency graph with files grouped into super-nodes.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        group_by: package (Java package, else directory) or directory
+        depth: Keep only this many package segments or directory levels
+        collapse_cycles: Merge groups that import each other into one super-node
+    
+    Returns:
+        Super-nodes with file counts and risk totals, and edges weighted by
+        the number of file dependencies they stand for
+    """
+    analysis = await load_analysis(repo_id)
+    coarse_graph = await run_in_threadpool(get_coarse_graph, repo_id, analysis, group_by, depth, collapse_cycles)
+    return JSONResponse(content={
+        "repo_id": repo_id,
+        "group_by": group_by,
+        "depth": depth,
+        **coarse_graph.to_dict(),
+    })
+
+
+@app.get("/graph/{repo_id}/coarse/expand")
+async def expand_coarse_graph_node(
+    repo_id: str,
+    node: str,
+    group_by: str = Query("package", pattern="^(package|directory)$"),
+    depth: Optional[int] = Query(None, ge=1),
+    collapse_cycles: bool = True,
+    limit: int = Query(MAX_EXPANDED_FILES, ge=1, le=MAX_EXPANDED_FILES),
+):
+    """
+    Get the files inside one super-node of /graph/{repo_id}/coarse.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        node: Super-node id
+        group_by, depth, collapse_cycles: Same as the coarse graph being expanded
+        limit: Largest number of files to return, riskiest first
+    
+    Returns:
+        The super-node's files, the edges among them, and their edges to
+        other super-nodes weighted by count
+    """
+    analysis = await load_analysis(repo_id)
+    coarse_graph = await run_in_threadpool(get_coarse_graph, repo_id, analysis, group_by, depth, collapse_cycles)
+    expanded = coarse_graph.expand(node, limit)
+    if expanded is None:
+        raise HTTPException(status_code=404, detail=f"Node '{node}' not found")
+    
+    return JSONResponse(content=expanded)
+
+
 @app.get("/analysis/{repo_id}")
-async def get_analysis(repo_id: str):
+async def get_analysis(
+    repo_id: str,
+    include_content: bool = False,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    sort: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    language: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+    sections: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^(rows|columnar)$"),
+    timings: bool = False,
+    accept: Optional[str] = Header(None),
+):
     """
     Get cached analysis results.
     
+    Without query parameters the full analysis is returned. Paging, sorting
+    and filtering apply to ``files`` and add a ``page`` block with the total.
+    
     Args:
         repo_id: Repository ID from previous analysis
+        include_content: Inline each file's source as ``content``; use
+            /source/{repo_id}/{file_path} to fetch single files instead
+        offset: Number of matching files to skip
+        limit: Maximum number of files to return
+        sort: One of risk_score, loc, imported_by_count, pagerank, transitive_fan_in
+        order: desc (default) or asc
+        language: Only files in this language
+        risk_level: Only files with this risk level (LOW, MEDIUM, HIGH)
+        path_prefix: Only files whose path starts with this prefix
+        fields: Comma-separated file fields to return, e.g. path,loc,risk_score
+        sections: Comma-separated top-level sections to return, e.g. summary,files
+        format: rows (default) or columnar; columnar is also selected by an
+            Accept header of application/vnd.legacymap.columnar+json
+        timings: Include the ``timings`` block with per-phase durations and
+            counts of the scan; they are always sent in the Server-Timing header
     
     Returns:
         Analysis results
     """
-    if repo_id not in analysis_cache:
+    analysis = await load_analysis(repo_id)
+    if sort is not None and sort not in SORT_KEYS:
         raise HTTPException(
-            status_code=404,
-            detail="Analysis not found"
+            status_code=400,
+            detail=f"sort must be one of: {', '.join(SORT_KEYS)}"
+        )
+    
+    files = analysis.get("files", [])
+    page = None
+    
+    if offset or limit is not None or sort or language or risk_level or path_prefix:
+        analysis_index = analysis_index_cache.get(repo_id)
+        if analysis_index is None or analysis_index.files is not files:
+            analysis_index = AnalysisIndex(files)
+            analysis_index_cache[repo_id] = analysis_index
+        
+        total, files = analysis_index.query(
+            sort=sort,
+            descending=order == "desc",
+            language=language,
+            risk_level=risk_level,
+            path_prefix=path_prefix,
+            offset=offset,
+            limit=limit,
         )
+        page = {"offset": offset, "limit": limit, "total": total}
+    
+    content_store = get_content_store(repo_id) if include_content else None
+    if content_store is not None:
+        files = [
+            {**file_data, "content": content_store.get(file_data["file_id"])}
+            for file_data in files
+        ]
+    
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        files = [
+            {field: file_data[field] for field in selected_fields if field in file_data}
+            for file_data in files
+        ]
+    
+    analysis = {**analysis, "files": files}
+    scan_timings = (analysis.get("timings") or {}).get("phases", {})
+    if not timings:
+        analysis.pop("timings", None)
+    if page is not None:
+        analysis["page"] = page
     
-    return JSONResponse(content=analysis_cache[repo_id])
+    if sections:
+        selected_sections = {section.strip() for section in sections.split(",")}
+        selected_sections.update({"repo_id", "page"})
+        analysis = {key: value for key, value in analysis.items() if key in selected_sections}
+    
+    started = time.perf_counter()
+    if wants_columnar(format, accept):
+        response = ColumnarResponse(content=to_columnar(analysis))
+    else:
+        if isinstance(analysis.get("functions"), FunctionTable):
+            analysis = {**analysis, "functions": analysis["functions"].to_list()}
+        response = FastJSONResponse(content=analysis)
+    response.headers["Server-Timing"] = server_timing(
+        {**scan_timings, "serialize": time.perf_counter() - started}
+    )
+    return response
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: analysis durations, cache hit counts and analysis_cache size."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/source/{repo_id}/{file_path:path}")
+async def get_source(
+    repo_id: str,
+    file_path: str,
+    start_line: int = 1,
+    end_line: Optional[int] = None
+):
+    """
+    Get the source of a file, or an inclusive 1-based range of its lines.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        file_path: Path to the file
+        start_line: First line to return
+        end_line: Last line to return; defaults to the end of the file
+    """
+    content_store = get_content_store(repo_id)
+    if content_store is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    file_id = content_store.get_file_id(file_path)
+    if file_id is None:
+        raise HTTPException(status_code=404, detail=f"File '{file_path}' not found")
+    
+    lines = content_store.get_lines(file_id, start_line, end_line)
+    return {
+        "path": file_path,
+        "file_id": file_id,
+        "start_line": max(start_line, 1),
+        "end_line": max(start_line, 1) + len(lines) - 1,
+        "content": "\n".join(lines),
+    }
 
 
 @app.delete("/analysis/{repo_id}")
 async def delete_analysis(repo_id: str):
     """Delete analysis results."""
-    if repo_id in analysis_cache:
-        del analysis_cache[repo_id]
+    if await run_in_threadpool(remove_analysis, repo_id):
         return {"message": "Analysis deleted"}
     raise HTTPException(status_code=404, detail="Analysis not found")
 
 
-@app.post("/generate-summary/{repo_id}")
-async def get_ai_summary(repo_id: str):
-    """Generate an AI summary for a specific analysis."""
-    if repo_id not in analysis_cache:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    analysis_data = analysis_cache[repo_id]
-    summary = generate_summary(analysis_data)
-    return {"summary": summary}
+@app.on_event("shutdown")
+async def close_summary_service():
+    await summary_service.close()
 
 
-# Import zipfile for error handling
-import zipfile
+@app.post("/generate-summary/{repo_id}")
+async def get_ai_summary(repo_id: str, stream: bool = False, accept: Optional[str] = Header(None)):
+    """
+    Generate an AI summary for a specific analysis.
+    
+    Args:
+        repo_id: Repository ID from analysis
+        stream: Send the summary as server-sent events while it is generated;
+            also selected by an Accept header of text/event-stream
+    
+    Returns:
+        The whole summary, or ``data: {"token": ...}`` events followed by a
+        ``done`` event when streaming
+    """
+    analysis = await load_analysis(repo_id)
+    generation = summary_service.summarize(repo_id, analysis)
+    
+    if stream or (accept is not None and "text/event-stream" in accept):
+        async def events():
+            async for chunk in generation.stream():
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    return {"summary": await generation.text()}
 
 
 if __name__ == "__main__":
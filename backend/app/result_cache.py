@@ -0,0 +1,128 @@
+"""Content-addressed on-disk cache of per-file analysis results."""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+from .function_extractor import EXTRACTOR_VERSION
+
+
+# SQLite file holding cached results; RESULT_CACHE_MAX_BYTES=0 disables the cache
+RESULT_CACHE_PATH = os.getenv(
+    "RESULT_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "legacymap-results.sqlite3")
+)
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class FileResultCache:
+    """
+    Per-file results (LOC, imports, functions, call sites, spans) keyed by
+    content hash, language and extractor version.
+
+    Identical file content is parsed once no matter where it appears or how
+    many times it is uploaded. The least recently used entries are evicted
+    once the stored size passes max_bytes.
+    """
+
+    def __init__(self, path: str = RESULT_CACHE_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pending_hits = []
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS file_results ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS file_results_last_used ON file_results (last_used)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(content: str, language: str) -> str:
+        """Build the cache key of a file's content."""
+        digest = hashlib.sha256(content.encode("utf-8", errors="surrogatepass")).hexdigest()
+        return f"{digest}:{language}:{EXTRACTOR_VERSION}"
+
+    def get(self, key: str, relative_path: str, content: str) -> Optional[Dict[str, Any]]:
+        """Get a cached record, rebound to the path and content it was found at."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM file_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.pending_hits.append(key)
+
+        record = json.loads(row[0])
+        record["file"]["path"] = relative_path
+        record["file"]["content"] = content
+        for function in record["functions"]:
+            function["file"] = relative_path
+        return record
+
+    def put(self, key: str, record: Dict[str, Any]):
+        """Store a record; paths and content are stripped so it can be reused anywhere."""
+        file_data = {k: v for k, v in record["file"].items() if k != "content"}
+        file_data["path"] = ""
+        value = json.dumps({
+            **record,
+            "file": file_data,
+            "functions": [{**function, "file": ""} for function in record["functions"]],
+        })
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO file_results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+
+    def commit(self):
+        """Write pending results and hit times, then evict down to max_bytes."""
+        with self.lock:
+            if self.pending_hits:
+                now = time.time()
+                self.connection.executemany(
+                    "UPDATE file_results SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in self.pending_hits],
+                )
+                self.pending_hits = []
+            self.connection.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM file_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_free = total - self.max_bytes
+        evicted = []
+        for key, size in self.connection.execute(
+            "SELECT key, size FROM file_results ORDER BY last_used"
+        ):
+            evicted.append((key,))
+            to_free -= size
+            if to_free <= 0:
+                break
+
+        self.connection.executemany("DELETE FROM file_results WHERE key = ?", evicted)
+        self.connection.commit()
+
+
+def get_result_cache() -> Optional[FileResultCache]:
+    """Open the configured result cache, or None if it is disabled or unavailable."""
+    if RESULT_CACHE_MAX_BYTES <= 0:
+        return None
+    try:
+        return FileResultCache()
+    except sqlite3.Error as e:
+        print(f"Result cache unavailable: {e}")
+        return None
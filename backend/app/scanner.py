@@ -1,11 +1,13 @@
 """Code scanner and analyzer for LegacyMap."""
 
+import sys
 import os
 import zipfile
-import tempfile
-import shutil
-from pathlib import Path
-from typing import Dict, List, Any, Optional
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator, Callable
 import networkx as nx
 
 from .utils import (
@@ -15,115 +17,395 @@ from .utils import (
     count_lines,
     extract_imports_python,
     extract_imports_javascript,
-    extract_imports_java,
-    calculate_risk_score,
-    get_risk_level,
 )
 from .function_extractor import FunctionExtractor
+from .java_lexer import lex_java
+from .symbol_index import SymbolIndex
+from .call_graph import CallGraph
+from .file_graph import FileGraph
+from .function_table import FunctionTable
+from .graph_metrics import compute_graph_metrics, calculate_risk_scores
+from .dependency_resolver import DependencyResolver
+from .result_cache import FileResultCache
+from .content_store import ContentStore
+from .walker import PathFilter, walk, filter_archive
+
+
+# Parallel scan configuration; SCAN_WORKERS=1 keeps the serial path
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "1"))
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "64"))
+
+# Scanner reused by every batch a worker process handles
+_worker_scanner = None
+
+
+def _analyze_batch(
+    paths: List[Tuple[str, str]],
+    zip_path: Optional[str] = None,
+    result_cache_path: Optional[str] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """Analyze a batch of files (or archive members of zip_path) inside a worker process."""
+    global _worker_scanner
+    if _worker_scanner is None:
+        result_cache = FileResultCache(result_cache_path) if result_cache_path else None
+        _worker_scanner = CodeScanner(max_workers=1, result_cache=result_cache)
+    return list(_worker_scanner.analyze_files(paths, zip_path))
 
 
 class CodeScanner:
     """Scan and analyze code repositories."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        result_cache: Optional[FileResultCache] = None,
+        content_store_dir: Optional[str] = None,
+        file_callback: Optional[Callable[[Dict[str, Any], List[Dict[str, Any]]], None]] = None,
+        path_filter: Optional[PathFilter] = None
+    ):
+        """
+        Args:
+            max_workers: Worker processes for file analysis; 1 scans serially
+            batch_size: Number of files sent to a worker at a time
+            progress_callback: Called with (phase, files scanned, files total) as the
+                scan advances; an exception raised from it aborts the scan
+            result_cache: Content-addressed cache of per-file records; unchanged
+                files are not parsed again
+            content_store_dir: When set, file contents are moved out of the results
+                into a ContentStore in this directory and files carry a file_id
+            file_callback: Called with a copy of each file's data and its
+                functions as soon as the file has been scanned, before dependencies
+                and scores are computed
+            path_filter: Which files of a directory or archive are scanned; by
+                default .gitignore files and the SCAN_INCLUDE/SCAN_EXCLUDE globs apply
+        """
         self.function_extractor = FunctionExtractor()
-        self.temp_dir = None
+        self.max_workers = max_workers if max_workers is not None else SCAN_WORKERS
+        self.batch_size = batch_size if batch_size is not None else SCAN_BATCH_SIZE
+        self.progress_callback = progress_callback
+        self.file_callback = file_callback
+        self.path_filter = path_filter if path_filter is not None else PathFilter()
+        self.result_cache = result_cache
+        self.content_store_dir = content_store_dir
+        self.symbol_index = None
+        self.call_graph = None
+        self.file_graph = None
+        # phase -> seconds, and counts of what the last scan processed
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.content_store = None
+        # relative path -> [mtime_ns, size, sha256] of each file read by the last directory scan
+        self.manifest: Dict[str, list] = {}
+    
+    def report_progress(self, phase: str, files_scanned: int = 0, files_total: int = 0):
+        """Forward scan progress to the progress callback, if any."""
+        if self.progress_callback is not None:
+            self.progress_callback(phase, files_scanned, files_total)
+    
+    def add_timing(self, phase: str, seconds: float):
+        """Add time spent in a phase of the current scan."""
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
     
-    def extract_zip(self, zip_path: str) -> str:
-        """Extract ZIP file to temporary directory."""
-        self.temp_dir = tempfile.mkdtemp()
+    def walk_directory(self, directory: str) -> List[Tuple[str, str]]:
+        """
+        Collect supported files under a directory.
         
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(self.temp_dir)
+        Ignored directories are pruned before they are listed; see walker.walk.
         
-        return self.temp_dir
+        Returns:
+            List of (absolute path, relative path) pairs in walk order.
+        """
+        return walk(directory, self.path_filter)
     
-    def cleanup(self):
-        """Clean up temporary directory."""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-            self.temp_dir = None
+    def analyze_source(self, content: str, relative_path: str, language: str) -> Dict[str, Any]:
+        """
+        Analyze the source of a single file.
+        
+        Returns:
+            Per-file record with the file data, extracted functions, package,
+            call sites and function spans.
+        """
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key(content, language)
+            cached = self.result_cache.get(cache_key, relative_path, content)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+        
+        if language == "java":
+            # One tokenizer pass yields everything for Java
+            source = lex_java(content)
+            loc = source.loc
+            imports = source.imports
+            functions = self.function_extractor.java_source_functions(source, relative_path)
+            package = source.package
+            call_sites = source.call_sites
+            spans = source.spans
+        else:
+            # Count lines
+            loc = count_lines(content)
+            
+            # Extract imports
+            if language == "python":
+                imports = extract_imports_python(content)
+            else:
+                imports = extract_imports_javascript(content)
+            
+            # Extract functions
+            functions = self.function_extractor.extract_functions(
+                content, relative_path, language
+            )
+            
+            # Index call sites and function bodies
+            lines = content.split("\n")
+            package = None
+            call_sites = self.function_extractor.index_call_sites(lines, language)
+            spans = self.function_extractor.extract_function_spans(lines, language)
+        
+        record = {
+            "file": {
+                "path": relative_path,
+                "language": language,
+                "loc": loc,
+                "imports": imports,
+                "imports_count": len(imports),
+                "functions": [f["name"] for f in functions],
+                "function_count": len(functions),
+                "content": content,  # Store for later analysis
+            },
+            "functions": functions,
+            "package": package,
+            "call_sites": call_sites,
+            "spans": spans,
+        }
+        
+        if self.result_cache is not None:
+            self.result_cache.put(cache_key, record)
+        
+        return record
     
-    def scan_directory(self, directory: str) -> Dict[str, Any]:
+    def walk_zip(self, zip_ref: zipfile.ZipFile) -> List[Tuple[str, str]]:
         """
-        Scan directory and analyze code files.
+        Collect supported members of an archive without extracting it.
+        
+        Members are filtered by name with the same rules as a directory walk,
+        including the archive's .gitignore files, and paths are sanitized the
+        same way ZipFile.extractall does.
+        
+        Returns:
+            List of (member name, relative path) pairs in archive order.
+        """
+        members = []
+        # directory -> content of its .gitignore
+        ignore_files = {}
+        
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                continue
+            
+            parts = [
+                part for part in normalize_path(info.filename).split("/")
+                if part not in ("", ".", "..")
+            ]
+            if not parts:
+                continue
+            if parts[-1] == ".gitignore" and self.path_filter.respect_gitignore:
+                ignore_files["/".join(parts[:-1])] = zip_ref.read(info).decode('utf-8', errors='ignore')
+                continue
+            if not is_supported_file(parts[-1]):
+                continue
+            
+            members.append((info.filename, "/".join(parts)))
+        
+        accepted = filter_archive([relative_path for _, relative_path in members], ignore_files, self.path_filter)
+        return [member for member, keep in zip(members, accepted) if keep]
+    
+    def analyze_zip_member(
+        self,
+        zip_ref: zipfile.ZipFile,
+        member_name: str,
+        relative_path: str
+    ) -> Optional[Dict[str, Any]]:
+        """Decode and analyze a single archive member, or return None if it cannot be processed."""
+        try:
+            language = get_language(relative_path)
+            if not language:
+                return None
+            
+            started = time.perf_counter()
+            content = zip_ref.read(member_name).decode('utf-8', errors='ignore')
+            # Match the newline translation of reading an extracted file in text mode
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+            read = time.perf_counter()
+            
+            record = self.analyze_source(content, relative_path, language)
+            record["timings"] = {"read": read - started, "parse": time.perf_counter() - read}
+            return record
+        
+        except Exception as e:
+            print(f"Error processing {member_name}: {e}")
+            return None
+    
+    def analyze_file(self, file_path: str, relative_path: str) -> Optional[Dict[str, Any]]:
+        """Read and analyze a single file, or return None if it cannot be processed."""
+        try:
+            language = get_language(file_path)
+            if not language:
+                return None
+            
+            started = time.perf_counter()
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                stat = os.fstat(f.fileno())
+            digest = hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+            read = time.perf_counter()
+            
+            record = self.analyze_source(content, relative_path, language)
+            record["timings"] = {"read": read - started, "parse": time.perf_counter() - read}
+            record["manifest"] = [stat.st_mtime_ns, stat.st_size, digest]
+            return record
+        
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+            return None
+    
+    def analyze_files(
+        self,
+        paths: List[Tuple[str, str]],
+        zip_path: Optional[str] = None
+    ) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Analyze files serially or on a process pool.
+        
+        When zip_path is given, paths are (member name, relative path) pairs
+        read straight from that archive.
+        
+        Records are yielded in the order of paths either way, so the merged
+        results are identical regardless of the worker count.
+        """
+        if self.max_workers <= 1 or len(paths) <= self.batch_size:
+            try:
+                if zip_path is None:
+                    for file_path, relative_path in paths:
+                        yield self.analyze_file(file_path, relative_path)
+                else:
+                    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                        for member_name, relative_path in paths:
+                            yield self.analyze_zip_member(zip_ref, member_name, relative_path)
+            finally:
+                if self.result_cache is not None:
+                    self.result_cache.commit()
+            return
+        
+        batches = [
+            paths[i:i + self.batch_size]
+            for i in range(0, len(paths), self.batch_size)
+        ]
+        result_cache_path = self.result_cache.path if self.result_cache is not None else None
+        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            for records in executor.map(
+                _analyze_batch, batches, repeat(zip_path), repeat(result_cache_path)
+            ):
+                yield from records
+        finally:
+            # Drop batches that have not started if the consumer stopped early
+            executor.shutdown(cancel_futures=True)
+    
+    def build_results(
+        self,
+        records: Iterable[Optional[Dict[str, Any]]],
+        files_total: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Merge per-file records into the dependency graph, risk scores and summary.
+        
+        Args:
+            records: Per-file records from analyze_files
+            files_total: Number of records expected, for progress reporting
         
         Returns:
             Dictionary with analysis results including files, functions, and dependencies.
         """
         files_data = {}
-        all_functions = []
+        all_functions = FunctionTable()
         dependency_graph = nx.DiGraph()
+        symbol_index = SymbolIndex()
+        dependency_resolver = DependencyResolver()
         
-        # Walk through directory
-        for root, dirs, files in os.walk(directory):
-            # Skip common directories
-            dirs[:] = [d for d in dirs if d not in {
-                'node_modules', '.git', '__pycache__', 'venv', 'env',
-                '.venv', 'dist', 'build', '.next', 'coverage', 'target', 'bin', 'obj'
-            }]
-            
-            for file in files:
-                if not is_supported_file(file):
+        # Source content goes to a side store when one is configured
+        content_store = ContentStore.create(self.content_store_dir) if self.content_store_dir else None
+        
+        counts = self.counts
+        for name in ("files", "bytes", "cache_hits"):
+            counts.setdefault(name, 0)
+        manifest = self.manifest = {}
+        
+        self.report_progress("scanning", 0, files_total)
+        started = time.perf_counter()
+        try:
+            for files_scanned, record in enumerate(records, 1):
+                self.report_progress("scanning", files_scanned, files_total)
+                if record is None:
                     continue
                 
-                file_path = os.path.join(root, file)
-                relative_path = normalize_path(os.path.relpath(file_path, directory))
+                # Per-file read and parse times are summed, so with several
+                # workers they can exceed the wall-clock scan time
+                for phase, seconds in record.pop("timings", {}).items():
+                    self.add_timing(phase, seconds)
+                if record.pop("cached", False):
+                    counts["cache_hits"] += 1
                 
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    language = get_language(file)
-                    if not language:
-                        continue
-                    
-                    # Count lines
-                    loc = count_lines(content)
-                    
-                    # Extract imports
-                    if language == "python":
-                        imports = extract_imports_python(content)
-                    elif language == "java":
-                        imports = extract_imports_java(content)
-                    else:
-                        imports = extract_imports_javascript(content)
-                    
-                    # Extract functions
-                    functions = self.function_extractor.extract_functions(
-                        content, relative_path, language
-                    )
-                    
-                    # Store file data
-                    files_data[relative_path] = {
-                        "path": relative_path,
-                        "language": language,
-                        "loc": loc,
-                        "imports": imports,
-                        "imports_count": len(imports),
-                        "functions": [f["name"] for f in functions],
-                        "function_count": len(functions),
-                        "content": content,  # Store for later analysis
-                    }
-                    
-                    # Add functions to list
-                    all_functions.extend(functions)
-                    
-                    # Add to dependency graph
-                    dependency_graph.add_node(relative_path)
-                    
-                except Exception as e:
-                    print(f"Error processing {file_path}: {e}")
-                    continue
+                file_data = record["file"]
+                relative_path = file_data["path"] = sys.intern(file_data["path"])
+                counts["files"] += 1
+                if "manifest" in record:
+                    manifest[relative_path] = record.pop("manifest")
+                
+                if content_store is not None:
+                    file_data["file_id"] = content_store.add(relative_path, file_data.pop("content"))
+                    counts["bytes"] += content_store.offsets[file_data["file_id"]][1]
+                else:
+                    counts["bytes"] += len(file_data["content"].encode('utf-8', errors='surrogatepass'))
+                
+                # Store file data
+                file_data["package"] = record["package"]
+                files_data[relative_path] = file_data
+                
+                if file_data["language"] == "java":
+                    dependency_resolver.add_file(relative_path, record["package"])
+                
+                symbol_index.add_file(
+                    relative_path, file_data["language"], record["call_sites"], record["spans"]
+                )
+                
+                # Add functions to list
+                all_functions.extend(record["functions"])
+                
+                if self.file_callback is not None:
+                    # A copy: scores are added to file_data once every file is in
+                    self.file_callback(dict(file_data), record["functions"])
+                
+                # Add to dependency graph
+                dependency_graph.add_node(relative_path)
+        except BaseException:
+            if content_store is not None:
+                content_store.delete()
+            raise
+        
+        if content_store is not None:
+            content_store.finish()
+        self.add_timing("scan", time.perf_counter() - started)
         
         # Build dependency relationships
+        self.report_progress("resolving dependencies", len(files_data), files_total)
+        started = time.perf_counter()
         for file_path, file_data in files_data.items():
             for imported_module in file_data["imports"]:
-                # Try to find matching file
-                for other_file in files_data.keys():
-                    # Simple matching: check if import matches filename
-                    other_basename = Path(other_file).stem
-                    if imported_module == other_basename or imported_module.endswith(other_basename):
+                for other_file in dependency_resolver.resolve(imported_module):
+                    if other_file != file_path:
                         dependency_graph.add_edge(file_path, other_file)
         
         # Calculate imported_by counts
@@ -132,15 +414,47 @@ class CodeScanner:
             files_data[file_path]["imported_by"] = imported_by
             files_data[file_path]["imported_by_count"] = len(imported_by)
         
-        # Calculate risk scores
-        for file_path, file_data in files_data.items():
-            risk_score = calculate_risk_score(
-                file_data["loc"],
-                file_data["imported_by_count"],
-                file_data["imports_count"]
-            )
-            files_data[file_path]["risk_score"] = round(risk_score, 2)
-            files_data[file_path]["risk_level"] = get_risk_level(risk_score)
+        self.add_timing("resolve", time.perf_counter() - started)
+        
+        return self._score_and_index(
+            files_data, all_functions, dependency_graph, symbol_index, content_store, files_total
+        )
+    
+    def _score_and_index(
+        self,
+        files_data: Dict[str, Dict[str, Any]],
+        all_functions: FunctionTable,
+        dependency_graph: nx.DiGraph,
+        symbol_index: SymbolIndex,
+        content_store: Optional[ContentStore],
+        files_total: int,
+        metrics: Optional[Dict[str, list]] = None
+    ) -> Dict[str, Any]:
+        """
+        Score merged files, build the query indexes and assemble the results.
+        
+        Args:
+            metrics: Graph metrics aligned with files_data, if they are known
+                to be unchanged; computed from dependency_graph otherwise
+        """
+        # Calculate graph metrics and risk scores for all files at once
+        self.report_progress("scoring", len(files_data), files_total)
+        started = time.perf_counter()
+        file_list = list(files_data.values())
+        if metrics is None:
+            metrics = compute_graph_metrics(list(files_data), dependency_graph.edges())
+        risk_scores, risk_levels = calculate_risk_scores(
+            [file_data["loc"] for file_data in file_list],
+            [file_data["imported_by_count"] for file_data in file_list],
+            [file_data["imports_count"] for file_data in file_list],
+            metrics
+        )
+        for i, file_data in enumerate(file_list):
+            file_data["pagerank"] = round(metrics["pagerank"][i], 6)
+            file_data["transitive_fan_in"] = metrics["transitive_fan_in"][i]
+            file_data["scc_size"] = metrics["scc_size"][i]
+            file_data["risk_score"] = risk_scores[i]
+            file_data["risk_level"] = risk_levels[i]
         
         # Prepare summary
         total_files = len(files_data)
@@ -148,6 +462,21 @@ class CodeScanner:
         total_loc = sum(f["loc"] for f in files_data.values())
         avg_risk = sum(f["risk_score"] for f in files_data.values()) / total_files if total_files > 0 else 0
         
+        self.add_timing("score", time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        self.symbol_index = symbol_index
+        self.file_graph = FileGraph(list(files_data), dependency_graph.edges())
+        self.call_graph = CallGraph.build(
+            symbol_index, dependency_graph.edges(), self.function_extractor.call_keywords
+        )
+        self.content_store = content_store
+        self.add_timing("index", time.perf_counter() - started)
+        
+        counts = self.counts
+        counts["functions"] = total_functions
+        counts["edges"] = dependency_graph.number_of_edges()
+        
         return {
             "summary": {
                 "total_files": total_files,
@@ -160,14 +489,249 @@ class CodeScanner:
             "dependency_graph": {
                 "nodes": list(dependency_graph.nodes()),
                 "edges": list(dependency_graph.edges()),
-            }
+            },
+            "timings": {
+                "phases": {phase: round(seconds, 6) for phase, seconds in self.timings.items()},
+                "counts": dict(counts),
+            },
         }
     
+    def scan_directory(self, directory: str) -> Dict[str, Any]:
+        """
+        Scan directory and analyze code files.
+        
+        Returns:
+            Dictionary with analysis results including files, functions, and dependencies.
+        """
+        self.timings, self.counts = {}, {}
+        self.report_progress("walking")
+        started = time.perf_counter()
+        paths = self.walk_directory(directory)
+        self.add_timing("walk", time.perf_counter() - started)
+        return self.build_results(self.analyze_files(paths), len(paths))
+    
+    def rescan_directory(
+        self,
+        directory: str,
+        previous: Dict[str, Any],
+        manifest: Dict[str, list],
+        symbol_index: SymbolIndex,
+        content_store: Optional[ContentStore] = None
+    ) -> Dict[str, Any]:
+        """
+        Rescan a directory scanned before, parsing only what changed.
+        
+        Files whose mtime and size match the manifest are not read, and files
+        whose content hash still matches are not parsed. Their file records,
+        functions, call sites and dependency edges are carried over from the
+        previous results; imports are resolved again only for changed files,
+        or for every file if a Java class was added, removed or moved to
+        another package, and graph metrics are recomputed only if the
+        dependency graph changed.
+        
+        Args:
+            directory: Directory scanned before
+            previous: Results of the previous scan; left untouched
+            manifest: The scanner's manifest after the previous scan
+            symbol_index: Call-site index of the previous scan; left untouched
+            content_store: Content store of the previous scan, if contents were moved out;
+                if it is gone, unchanged files are read again (but not parsed)
+        
+        Returns:
+            Results in the same shape as scan_directory. The timings counts
+            also hold how many files were added, changed, removed and unchanged.
+        """
+        self.timings, self.counts = {}, {}
+        counts = self.counts
+        for name in ("files", "bytes", "cache_hits"):
+            counts[name] = 0
+        previous_files = {file_data["path"]: file_data for file_data in previous.get("files", [])}
+        
+        self.report_progress("walking")
+        started = time.perf_counter()
+        paths = self.walk_directory(directory)
+        new_manifest = {}
+        # relative path -> content of unchanged files whose previous content is no longer stored
+        reread = {}
+        to_scan = []
+        for file_path, relative_path in paths:
+            entry = manifest.get(relative_path)
+            if entry is not None and relative_path in previous_files:
+                try:
+                    stat = os.stat(file_path)
+                    if stat.st_mtime_ns == entry[0] and stat.st_size == entry[1]:
+                        if content_store is None and "content" not in previous_files[relative_path]:
+                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                                reread[relative_path] = f.read()
+                        new_manifest[relative_path] = entry
+                        continue
+                except OSError:
+                    continue
+            to_scan.append((file_path, relative_path))
+        self.add_timing("walk", time.perf_counter() - started)
+        
+        # Parse new and modified files; touched files with the same hash are kept as they were
+        records = {}
+        # Progress counts every file, the unchanged ones being done already
+        files_total = len(paths)
+        files_unchanged = len(new_manifest)
+        self.report_progress("scanning", files_unchanged, files_total)
+        started = time.perf_counter()
+        scanned = zip(to_scan, self.analyze_files(to_scan))
+        for files_scanned, ((_, relative_path), record) in enumerate(scanned, files_unchanged + 1):
+            self.report_progress("scanning", files_scanned, files_total)
+            if record is None:
+                continue
+            for phase, seconds in record.pop("timings", {}).items():
+                self.add_timing(phase, seconds)
+            if record.pop("cached", False):
+                counts["cache_hits"] += 1
+            entry = new_manifest[relative_path] = record.pop("manifest")
+            old_entry = manifest.get(relative_path)
+            if old_entry is None or old_entry[2] != entry[2] or relative_path not in previous_files:
+                records[relative_path] = record
+        
+        removed = [path for path in previous_files if path not in new_manifest]
+        changed = [path for path in records if path in previous_files]
+        counts["added"] = len(records) - len(changed)
+        counts["changed"] = len(changed)
+        counts["removed"] = len(removed)
+        counts["unchanged"] = len(new_manifest) - len(records)
+        
+        # Merge carried-over and new files in walk order
+        files_data = {}
+        all_functions = FunctionTable()
+        previous_functions = previous.get("functions", [])
+        if not isinstance(previous_functions, FunctionTable):
+            previous_functions = FunctionTable.from_list(previous_functions)
+        function_rows = previous_functions.rows_by_file()
+        symbol_index = symbol_index.without_files(set(removed).union(changed))
+        new_content_store = ContentStore.create(self.content_store_dir) if self.content_store_dir else None
+        try:
+            for _, relative_path in paths:
+                if relative_path not in new_manifest:
+                    continue
+                record = records.get(relative_path)
+                if record is None:
+                    # Copied, so the previous results stay valid for anyone still reading them
+                    file_data = dict(previous_files[relative_path])
+                    all_functions.copy_rows(previous_functions, function_rows.get(relative_path, ()))
+                    if "content" in file_data:
+                        content = file_data.pop("content")
+                    elif relative_path in reread:
+                        file_data.pop("file_id", None)
+                        content = reread.pop(relative_path)
+                    else:
+                        content = content_store.get(file_data.pop("file_id"))
+                else:
+                    file_data = record["file"]
+                    relative_path = file_data["path"] = sys.intern(relative_path)
+                    file_data["package"] = record["package"]
+                    symbol_index.add_file(
+                        relative_path, file_data["language"], record["call_sites"], record["spans"]
+                    )
+                    all_functions.extend(record["functions"])
+                    content = file_data.pop("content")
+                
+                counts["files"] += 1
+                if new_content_store is not None:
+                    file_data["file_id"] = new_content_store.add(relative_path, content)
+                    counts["bytes"] += new_content_store.offsets[file_data["file_id"]][1]
+                else:
+                    file_data["content"] = content
+                    counts["bytes"] += len(content.encode('utf-8', errors='surrogatepass'))
+                files_data[relative_path] = file_data
+        except BaseException:
+            if new_content_store is not None:
+                new_content_store.delete()
+            raise
+        
+        if new_content_store is not None:
+            new_content_store.finish()
+        self.manifest = new_manifest
+        self.add_timing("scan", time.perf_counter() - started)
+        
+        # Keep the edges of unchanged files unless the set of resolvable classes changed
+        self.report_progress("resolving dependencies", len(files_data), files_total)
+        started = time.perf_counter()
+        
+        def java_classes(files: Dict[str, Dict[str, Any]]) -> set:
+            return {(path, f["package"]) for path, f in files.items() if f["language"] == "java"}
+        
+        resolve_all = java_classes(previous_files) != java_classes(files_data)
+        dependency_resolver = DependencyResolver()
+        if resolve_all or records:
+            for file_path, file_data in files_data.items():
+                if file_data["language"] == "java":
+                    dependency_resolver.add_file(file_path, file_data["package"])
+        
+        previous_edges = previous.get("dependency_graph", {}).get("edges", [])
+        previous_targets: Dict[str, List[str]] = {}
+        for source, target in previous_edges:
+            previous_targets.setdefault(source, []).append(target)
+        
+        dependency_graph = nx.DiGraph()
+        dependency_graph.add_nodes_from(files_data)
+        for file_path, file_data in files_data.items():
+            if resolve_all or file_path in records:
+                for imported_module in file_data["imports"]:
+                    for other_file in dependency_resolver.resolve(imported_module):
+                        if other_file != file_path:
+                            dependency_graph.add_edge(file_path, other_file)
+            else:
+                dependency_graph.add_edges_from(
+                    (file_path, other_file) for other_file in previous_targets.get(file_path, ())
+                )
+        
+        for file_path, file_data in files_data.items():
+            imported_by = list(dependency_graph.predecessors(file_path))
+            file_data["imported_by"] = imported_by
+            file_data["imported_by_count"] = len(imported_by)
+        
+        # Graph metrics only depend on the graph, so reuse them if it is the same
+        metrics = None
+        if files_data.keys() == previous_files.keys() and (
+            set(dependency_graph.edges()) == {(source, target) for source, target in previous_edges}
+        ):
+            metrics = {
+                name: [previous_files[path][name] for path in files_data]
+                for name in ("pagerank", "transitive_fan_in", "scc_size")
+            }
+        self.add_timing("resolve", time.perf_counter() - started)
+        
+        return self._score_and_index(
+            files_data, all_functions, dependency_graph, symbol_index, new_content_store, files_total, metrics
+        )
+    
+    def build_symbol_index(
+        self,
+        files_data: List[Dict[str, Any]],
+        content_store: Optional[ContentStore] = None
+    ) -> SymbolIndex:
+        """Rebuild the call-site index of an analysis from its stored file contents."""
+        symbol_index = SymbolIndex()
+        for file_data in files_data:
+            language = file_data.get("language", "")
+            if content_store is not None and "file_id" in file_data:
+                content = content_store.get(file_data["file_id"])
+            else:
+                content = file_data.get("content", "")
+            if language == "java":
+                source = lex_java(content)
+                call_sites, spans = source.call_sites, source.spans
+            else:
+                lines = content.split("\n")
+                call_sites = self.function_extractor.index_call_sites(lines, language)
+                spans = self.function_extractor.extract_function_spans(lines, language)
+            symbol_index.add_file(file_data["path"], language, call_sites, spans)
+        return symbol_index
+    
     def get_function_details(
         self,
         files_data: List[Dict[str, Any]],
         file_path: str,
-        function_name: str
+        function_name: str,
+        symbol_index: Optional[SymbolIndex] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Get detailed information about a specific function.
@@ -176,10 +740,30 @@ class CodeScanner:
             files_data: List of file data from scan results
             file_path: Path to the file containing the function
             function_name: Name of the function
+            symbol_index: Index built by scan_directory; when given, call sites and
+                dependencies are looked up instead of rescanning every file
         
         Returns:
             Dictionary with function details including call sites and dependencies
         """
+        if symbol_index is not None:
+            if not symbol_index.has_file(file_path):
+                return None
+            
+            call_sites = symbol_index.find_callers(function_name)
+            dependencies = symbol_index.find_callees(
+                file_path, function_name, self.function_extractor.call_keywords
+            )
+            
+            return {
+                "name": function_name,
+                "file": file_path,
+                "language": symbol_index.file_languages[file_path],
+                "called_in": call_sites,
+                "dependencies": dependencies,
+                "call_count": sum(site["count"] for site in call_sites),
+            }
+        
         # Find the file
         target_file = None
         for file_data in files_data:
@@ -234,15 +818,12 @@ class CodeScanner:
         Returns:
             Analysis results
         """
-        try:
-            # Extract ZIP
-            extract_dir = self.extract_zip(zip_path)
-            
-            # Scan directory
-            results = self.scan_directory(extract_dir)
-            
-            return results
+        # Read matching members straight from the archive instead of extracting it
+        self.timings, self.counts = {}, {}
+        self.report_progress("walking")
+        started = time.perf_counter()
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = self.walk_zip(zip_ref)
+        self.add_timing("walk", time.perf_counter() - started)
         
-        finally:
-            # Always cleanup
-            self.cleanup()
+        return self.build_results(self.analyze_files(members, zip_path), len(members))
@@ -0,0 +1,166 @@
+"""Newline-delimited JSON streams of analysis results."""
+
+import os
+import asyncio
+import threading
+import concurrent.futures
+from typing import Dict, List, Any, AsyncIterator, Iterator, Optional
+
+from .columnar import encode_json
+from .function_table import FunctionTable
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Records buffered between a running scan and a slow client; the scan waits when the buffer is full
+STREAM_BUFFER_RECORDS = int(os.getenv("STREAM_BUFFER_RECORDS", "256"))
+# Seconds a scan waits on a client that stopped reading before the job is cancelled; 0 waits for good
+STREAM_STALL_SECONDS = float(os.getenv("STREAM_STALL_SECONDS", "300"))
+# Edges sent per "edges" record
+STREAM_EDGE_BATCH = int(os.getenv("STREAM_EDGE_BATCH", "1000"))
+
+# File fields computed from the dependency graph, sent in "scores" records
+SCORE_FIELDS = (
+    "imported_by", "imported_by_count", "pagerank", "transitive_fan_in", "scc_size", "risk_score", "risk_level"
+)
+
+
+def encode_line(record: Dict[str, Any]) -> bytes:
+    """Serialize one record as a line of NDJSON."""
+    return encode_json(record) + b"\n"
+
+
+def file_record(file_data: Dict[str, Any], functions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """A "file" record: one scanned file and its functions, before dependencies are resolved."""
+    return {
+        "type": "file",
+        "file": {key: value for key, value in file_data.items() if key != "content"},
+        "functions": functions,
+    }
+
+
+def file_records(results: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """The "file" records of a finished analysis, as a live scan would have sent them."""
+    functions = results.get("functions", [])
+    if not isinstance(functions, FunctionTable):
+        functions = FunctionTable.from_list(functions)
+    rows = functions.rows_by_file()
+    for file_data in results.get("files", []):
+        scanned = {key: value for key, value in file_data.items() if key not in SCORE_FIELDS}
+        yield file_record(scanned, [functions.record(i) for i in rows.get(file_data["path"], ())])
+
+
+def result_records(results: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Everything after the "file" records of an analysis.
+
+    Dependency edges come in batches of ``[source, target]`` pairs, then one
+    "scores" record per file with what was computed from the graph, and
+    finally the summary.
+    """
+    edges = results.get("dependency_graph", {}).get("edges", [])
+    for start in range(0, len(edges), STREAM_EDGE_BATCH):
+        yield {"type": "edges", "edges": [list(edge) for edge in edges[start:start + STREAM_EDGE_BATCH]]}
+
+    for file_data in results.get("files", []):
+        record = {"type": "scores", "path": file_data["path"]}
+        record.update((field, file_data.get(field)) for field in SCORE_FIELDS)
+        yield record
+
+    yield {"type": "summary", "repo_id": results.get("repo_id"), "summary": results.get("summary", {})}
+
+
+class RecordStream:
+    """
+    Records handed from a scanning thread to an async response.
+
+    At most ``max_buffered`` records wait to be sent, so a slow client slows
+    the scan down instead of letting records pile up in memory. Once the
+    response stops reading, the job is cancelled or the client stalls for
+    ``stall_seconds``, further records are dropped.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        max_buffered: int = STREAM_BUFFER_RECORDS,
+        cancel_event: Optional[threading.Event] = None,
+        stall_seconds: float = STREAM_STALL_SECONDS
+    ):
+        """
+        Args:
+            loop: Event loop the response runs on
+            max_buffered: Records waiting to be sent before the scan waits
+            cancel_event: The job's cancel event; set it to stop waiting on the client
+            stall_seconds: Seconds to wait on a full buffer before giving up on
+                the client and setting cancel_event; 0 waits for good
+        """
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(max_buffered)
+        self.closed = threading.Event()
+        self.cancel_event = cancel_event
+        self.stall_seconds = stall_seconds
+
+    def put(self, record: Any):
+        """Queue a record from the scanning thread, waiting while the buffer is full."""
+        if self.closed.is_set():
+            return
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.cancel()
+            return
+        try:
+            future = asyncio.run_coroutine_threadsafe(self.queue.put(record), self.loop)
+        except RuntimeError:
+            # The event loop has shut down
+            self.closed.set()
+            return
+        waited = 0.0
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                waited += 0.5
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.cancel()
+                elif self.stall_seconds and waited >= self.stall_seconds:
+                    # The client stopped reading: stop the scan rather than hold its worker
+                    if self.cancel_event is not None:
+                        self.cancel_event.set()
+                    self.cancel()
+                if self.closed.is_set():
+                    future.cancel()
+                    return
+            except concurrent.futures.CancelledError:
+                self.closed.set()
+                return
+
+    def finish(self):
+        """Mark the end of the records; called from the scanning thread."""
+        self.put(None)
+
+    def cancel(self):
+        """Drop further records and end records(); safe from any thread and more than once."""
+        self.closed.set()
+        try:
+            self.loop.call_soon_threadsafe(self._end)
+        except RuntimeError:
+            # The event loop has shut down
+            pass
+
+    def _end(self):
+        # Make room for the end marker; the stream is incomplete anyway
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def records(self) -> AsyncIterator[Any]:
+        """Yield records until finish or cancel is called."""
+        try:
+            while True:
+                record = await self.queue.get()
+                if record is None:
+                    return
+                yield record
+        finally:
+            self.closed.set()
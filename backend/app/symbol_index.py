@@ -0,0 +1,81 @@
+"""Symbol and call-site index built while scanning a repository."""
+
+from typing import Dict, List, Any
+
+
+class SymbolIndex:
+    """
+    Inverted index of call sites plus per-file function span tables.
+
+    Built once by CodeScanner.scan_directory so function details can be
+    answered with dictionary lookups instead of rescanning every file.
+    """
+
+    def __init__(self):
+        # file path -> language
+        self.file_languages: Dict[str, str] = {}
+        # identifier -> {file path -> [line numbers]}, files in scan order
+        self.call_sites: Dict[str, Dict[str, List[int]]] = {}
+        # file path -> {function name -> {"start", "end", "calls"}}
+        self.spans: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def add_file(
+        self,
+        file_path: str,
+        language: str,
+        call_sites: Dict[str, List[int]],
+        spans: Dict[str, Dict[str, Any]]
+    ):
+        """Merge the call sites and span table of one scanned file."""
+        self.file_languages[file_path] = language
+        self.spans[file_path] = spans
+        for name, lines in call_sites.items():
+            self.call_sites.setdefault(name, {})[file_path] = lines
+
+    def has_file(self, file_path: str) -> bool:
+        """Check whether a file was indexed."""
+        return file_path in self.file_languages
+
+    def find_callers(self, function_name: str) -> List[Dict[str, Any]]:
+        """Get the files and lines where a function is called."""
+        return [
+            {"file": file_path, "lines": lines, "count": len(lines)}
+            for file_path, lines in self.call_sites.get(function_name, {}).items()
+        ]
+
+    def find_callees(self, file_path: str, function_name: str, excluded: set) -> List[str]:
+        """Get what a function calls, from the span table of its file."""
+        span = self.spans.get(file_path, {}).get(function_name)
+        if span is None:
+            return []
+        return [name for name in span["calls"] if name not in excluded and name != function_name]
+
+    def without_files(self, file_paths: set) -> "SymbolIndex":
+        """Get a copy of the index with some files removed; this index is left untouched."""
+        index = SymbolIndex()
+        index.file_languages = {
+            path: language for path, language in self.file_languages.items() if path not in file_paths
+        }
+        index.spans = {path: spans for path, spans in self.spans.items() if path not in file_paths}
+        for name, files in self.call_sites.items():
+            kept = {path: lines for path, lines in files.items() if path not in file_paths}
+            if kept:
+                index.call_sites[name] = kept
+        return index
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a JSON-serializable copy of the index."""
+        return {
+            "file_languages": self.file_languages,
+            "call_sites": self.call_sites,
+            "spans": self.spans,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SymbolIndex":
+        """Rebuild an index from to_dict output."""
+        index = cls()
+        index.file_languages = data["file_languages"]
+        index.call_sites = data["call_sites"]
+        index.spans = data["spans"]
+        return index
@@ -0,0 +1,156 @@
+"""
+Multipart uploads streamed straight from the request body to disk.
+
+FastAPI spools ``UploadFile`` parameters to a temporary file before the
+handler runs, so a size limit checked there only applies once the whole
+body has been received. Parsing the body as it arrives lets an oversized
+upload be refused after at most the limit has been read.
+"""
+
+import hashlib
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiofiles
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
+
+
+# Allowance for multipart boundaries, part headers and small form fields on top
+# of the file itself when the whole body is checked against the limit
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the size limit."""
+
+
+class InvalidUpload(Exception):
+    """Raised when the body is not multipart form data with the expected file field."""
+
+
+class _FilePart:
+    """Parser callbacks collecting the data of one file field."""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.header_name = b""
+        self.header_value = b""
+        self.disposition = b""
+        self.in_file = False
+        self.filename: Optional[str] = None
+        self.pending: List[bytes] = []
+        self.done = False
+
+    def on_part_begin(self):
+        self.disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.header_name.lower() == b"content-disposition":
+            self.disposition = self.header_value
+        self.header_name = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        # Only the first file under the field name is kept
+        self.in_file = name == self.field_name and b"filename" in options and self.filename is None
+        if self.in_file:
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self.in_file = False
+
+    def on_end(self):
+        self.done = True
+
+
+async def receive_upload(
+    body: AsyncIterator[bytes],
+    content_type: Optional[str],
+    destination: str,
+    field_name: str = "file",
+    max_bytes: int = 0,
+    chunk_size: int = 1024 * 1024
+) -> Tuple[str, str]:
+    """
+    Write the file field of a multipart body to disk as the body arrives.
+
+    Args:
+        body: The request body, e.g. ``request.stream()``
+        content_type: Content-Type header of the request
+        destination: File to write the upload to
+        field_name: Form field holding the file
+        max_bytes: Largest file accepted; 0 disables the limit
+        chunk_size: Data buffered before each write to disk
+
+    Returns:
+        Filename sent by the client and SHA-256 hex digest of the content
+
+    Raises:
+        UploadTooLarge: As soon as the file, or the whole body, exceeds the limit
+        InvalidUpload: If the body is not multipart or has no such file field
+    """
+    if not content_type:
+        raise InvalidUpload("Expected multipart/form-data")
+    media_type, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if media_type != b"multipart/form-data" or not boundary:
+        raise InvalidUpload("Expected multipart/form-data")
+
+    part = _FilePart(field_name)
+    parser = MultipartParser(boundary, {
+        "on_part_begin": part.on_part_begin,
+        "on_part_data": part.on_part_data,
+        "on_part_end": part.on_part_end,
+        "on_header_field": part.on_header_field,
+        "on_header_value": part.on_header_value,
+        "on_header_end": part.on_header_end,
+        "on_headers_finished": part.on_headers_finished,
+        "on_end": part.on_end,
+    })
+    body_limit = max_bytes + MULTIPART_OVERHEAD_BYTES if max_bytes else 0
+    digest = hashlib.sha256()
+    received = 0
+    size = 0
+    buffer: List[bytes] = []
+    buffered = 0
+
+    async with aiofiles.open(destination, 'wb') as out:
+        async for chunk in body:
+            received += len(chunk)
+            if body_limit and received > body_limit:
+                raise UploadTooLarge(max_bytes)
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise InvalidUpload(str(e))
+
+            for data in part.pending:
+                size += len(data)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(data)
+                buffer.append(data)
+                buffered += len(data)
+            part.pending.clear()
+            if buffered >= chunk_size:
+                await out.write(b"".join(buffer))
+                buffer.clear()
+                buffered = 0
+        parser.finalize()
+        await out.write(b"".join(buffer))
+
+    if part.filename is None or not part.done:
+        raise InvalidUpload(f"Missing file field '{field_name}'")
+    return part.filename, digest.hexdigest()
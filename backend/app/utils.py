@@ -2,9 +2,20 @@
 
 import os
 import re
-from pathlib import Path
 from typing import Optional
 
+from .java_lexer import lex_java
+
+
+# Supported source extensions and their language; user requested ONLY Java support
+LANGUAGE_BY_EXTENSION = {".java": "java"}
+
+# Where analyses and their source content are kept across restarts; backend/data by default
+DATA_DIR = os.getenv(
+    "LEGACYMAP_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+)
+
 
 def normalize_path(path: str) -> str:
     """Normalize file path to use forward slashes."""
@@ -13,22 +24,21 @@ def normalize_path(path: str) -> str:
 
 def get_file_extension(filename: str) -> str:
     """Get file extension in lowercase."""
-    return Path(filename).suffix.lower()
+    dot = filename.rfind(".")
+    # No extension for names without a dot or starting with one (".gitignore")
+    if dot <= filename.rfind("/") + 1:
+        return ""
+    return filename[dot:].lower()
 
 
 def is_supported_file(filename: str) -> bool:
     """Check if file is a supported code file."""
-    # User requested ONLY Java support
-    supported_extensions = {".java"}
-    return get_file_extension(filename) in supported_extensions
+    return get_file_extension(filename) in LANGUAGE_BY_EXTENSION
 
 
 def get_language(filename: str) -> Optional[str]:
     """Determine programming language from file extension."""
-    ext = get_file_extension(filename)
-    if ext == ".java":
-        return "java"
-    return None
+    return LANGUAGE_BY_EXTENSION.get(get_file_extension(filename))
 
 
 def count_lines(content: str) -> int:
@@ -46,7 +56,7 @@ def extract_imports_python(content: str) -> list[str]:
             module = match.group(1) or match.group(2)
             if module:
                 imports.append(module.split(".")[0])
-    return list(set(imports))
+    return sorted(set(imports))
 
 
 def extract_imports_javascript(content: str) -> list[str]:
@@ -62,29 +72,18 @@ def extract_imports_javascript(content: str) -> list[str]:
             module = match.group(1)
             if not module.startswith(".") and not module.startswith("/"):
                 imports.append(module)
-    return list(set(imports))
+    return sorted(set(imports))
 
 
 def extract_imports_java(content: str) -> list[str]:
     """Extract import statements from Java code."""
-    imports = []
-    # Match: import com.example.package;
-    # Match: import static com.example.package.Class;
-    import_pattern = r"^\s*import\s+(?:static\s+)?([a-zA-Z0-9_.]+);"
-    
-    for line in content.split("\n"):
-        match = re.match(import_pattern, line)
-        if match:
-            full_import = match.group(1)
-            # For analysis, we might want the top-level package or the specific class
-            # Let's keep the full import path for now, or maybe just the class name?
-            # Usually dependency graphs in Java map classes to classes.
-            # If we import 'java.util.List', we depend on 'List'.
-            # But often we want to see internal project dependencies.
-            # Let's store the full package for now.
-            imports.append(full_import)
-            
-    return list(set(imports))
+    # Includes static imports and wildcard package imports (com.example.*)
+    return lex_java(content).imports
+
+
+def extract_package_java(content: str) -> Optional[str]:
+    """Extract the package declaration from Java code."""
+    return lex_java(content).package
 
 
 def calculate_risk_score(loc: int, imported_by_count: int, imports_count: int) -> float:
@@ -0,0 +1,328 @@
+"""
+Directory walking for scans: .gitignore rules, include/exclude globs and
+early pruning of skipped subtrees.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Iterable
+
+from .utils import LANGUAGE_BY_EXTENSION, get_file_extension
+
+
+# Directories never scanned, whatever .gitignore says
+IGNORED_DIRECTORIES = {
+    'node_modules', '.git', '__pycache__', 'venv', 'env',
+    '.venv', 'dist', 'build', '.next', 'coverage', 'target', 'bin', 'obj'
+}
+
+# Comma-separated gitignore-style globs: when set, only files matching one are scanned
+SCAN_INCLUDE = [glob.strip() for glob in os.getenv("SCAN_INCLUDE", "").split(",") if glob.strip()]
+# Comma-separated gitignore-style globs of files and directories never scanned
+SCAN_EXCLUDE = [glob.strip() for glob in os.getenv("SCAN_EXCLUDE", "").split(",") if glob.strip()]
+# Skip what the scanned tree's .gitignore files (and .git/info/exclude) ignore
+SCAN_RESPECT_GITIGNORE = os.getenv("SCAN_RESPECT_GITIGNORE", "true").lower() not in ("0", "false", "no")
+# Threads walking top-level subdirectories at once; 1 walks serially
+SCAN_WALK_WORKERS = int(os.getenv("SCAN_WALK_WORKERS", "1"))
+
+
+class IgnoreRule:
+    """One gitignore pattern, relative to the directory of the file it came from."""
+
+    __slots__ = ("base", "regex", "negate", "dir_only")
+
+    def __init__(self, base: str, regex: "re.Pattern", negate: bool, dir_only: bool):
+        self.base = base
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate the body of a gitignore pattern to a regular expression."""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                if at_start and pattern.startswith("**/", i):
+                    # Leading or middle **/ matches zero or more directories
+                    parts.append("(?:.*/)?")
+                    i += 3
+                    continue
+                parts.append(".*")
+                i += 2
+                continue
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+
+def compile_rule(pattern: str, base: str = "") -> Optional[IgnoreRule]:
+    """
+    Compile one line of a .gitignore file.
+
+    Patterns containing a slash other than a trailing one are anchored to
+    base; others match a name at any depth below it.
+
+    Returns:
+        The rule, or None for blank lines and comments
+    """
+    if pattern.endswith("\n"):
+        pattern = pattern[:-1]
+    # Trailing spaces are dropped unless escaped
+    stripped = pattern.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(pattern):
+        stripped += " "
+    pattern = stripped
+    if not pattern or pattern.startswith("#"):
+        return None
+
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+
+    anchored = "/" in pattern
+    body = _translate_glob(pattern.lstrip("/"))
+    regex = re.compile(("" if anchored else "(?:.*/)?") + body + r"\Z", re.DOTALL)
+    return IgnoreRule(base, regex, negate, dir_only)
+
+
+def compile_rules(patterns: Iterable[str], base: str = "") -> List[IgnoreRule]:
+    """Compile the lines of a .gitignore file, or a list of globs."""
+    return [rule for rule in (compile_rule(pattern, base) for pattern in patterns) if rule is not None]
+
+
+def _verdict(rules: Iterable[IgnoreRule], relative_path: str, is_dir: bool) -> Optional[bool]:
+    """Whether the last rule matching a path ignores it, or None if no rule matches."""
+    verdict = None
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        path = relative_path[len(rule.base) + 1:] if rule.base else relative_path
+        if rule.regex.match(path):
+            verdict = not rule.negate
+    return verdict
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class PathFilter:
+    """
+    Decide which directories and files of a tree are scanned.
+
+    Directories are decided before they are entered, so a skipped subtree
+    is never listed. Files are first checked against the supported
+    extensions, a dict lookup, and only source files are matched against
+    globs and .gitignore rules.
+    """
+
+    def __init__(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        respect_gitignore: Optional[bool] = None,
+        ignored_directories: Iterable[str] = IGNORED_DIRECTORIES
+    ):
+        """
+        Args:
+            include: Globs of files to scan; SCAN_INCLUDE by default, and every
+                supported file if empty
+            exclude: Globs of files and directories to skip; SCAN_EXCLUDE by default
+            respect_gitignore: Apply .gitignore files; SCAN_RESPECT_GITIGNORE by default
+            ignored_directories: Directory names always skipped
+        """
+        self.include = compile_rules(SCAN_INCLUDE if include is None else include)
+        self.exclude = compile_rules(SCAN_EXCLUDE if exclude is None else exclude)
+        self.respect_gitignore = SCAN_RESPECT_GITIGNORE if respect_gitignore is None else respect_gitignore
+        self.ignored_directories = frozenset(ignored_directories)
+
+    def add_ignore_file(self, rules: Tuple[IgnoreRule, ...], base: str, text: Optional[str]) -> Tuple[IgnoreRule, ...]:
+        """Get the rules in effect inside directory base, from its parent's and its own .gitignore."""
+        if not self.respect_gitignore or not text:
+            return rules
+        return rules + tuple(compile_rules(text.splitlines(), base))
+
+    def skips_directory(self, name: str, relative_path: str, rules: Tuple[IgnoreRule, ...]) -> bool:
+        """Check whether a directory (and everything below it) is skipped."""
+        return name in self.ignored_directories or self._ignored(relative_path, True, rules)
+
+    def accepts_file(self, name: str, relative_path: str, rules: Tuple[IgnoreRule, ...]) -> bool:
+        """Check whether a file is scanned."""
+        if get_file_extension(name) not in LANGUAGE_BY_EXTENSION:
+            return False
+        if self.include and not _verdict(self.include, relative_path, False):
+            return False
+        return not self._ignored(relative_path, False, rules)
+
+    def _ignored(self, relative_path: str, is_dir: bool, rules: Tuple[IgnoreRule, ...]) -> bool:
+        verdict = _verdict(self.exclude, relative_path, is_dir)
+        if verdict is not None:
+            return verdict
+        return bool(rules) and bool(_verdict(rules, relative_path, is_dir))
+
+
+def _walk_tree(
+    path: str,
+    relative_path: str,
+    rules: Tuple[IgnoreRule, ...],
+    path_filter: PathFilter,
+    paths: List[Tuple[str, str]],
+    subdirectories: Optional[List[Tuple[str, str, tuple]]] = None
+):
+    """
+    Collect the files of a tree in os.walk order: a directory's files, then
+    each of its subdirectories in listing order.
+
+    When subdirectories is given, only the top directory is listed and its
+    subdirectories are appended there instead of being walked.
+    """
+    stack = [(path, relative_path, rules)]
+    while stack:
+        path, relative_path, rules = stack.pop()
+        try:
+            with os.scandir(path) as scan:
+                entries = list(scan)
+        except OSError:
+            continue
+
+        if path_filter.respect_gitignore and any(entry.name == ".gitignore" for entry in entries):
+            rules = path_filter.add_ignore_file(rules, relative_path, _read_text(os.path.join(path, ".gitignore")))
+
+        children = []
+        for entry in entries:
+            name = entry.name
+            child_path = f"{relative_path}/{name}" if relative_path else name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                # Like os.walk, symlinked directories are not followed
+                if not entry.is_symlink() and not path_filter.skips_directory(name, child_path, rules):
+                    children.append((entry.path, child_path, rules))
+            elif path_filter.accepts_file(name, child_path, rules):
+                paths.append((entry.path, child_path))
+
+        if subdirectories is not None:
+            subdirectories.extend(children)
+            return
+        stack.extend(reversed(children))
+
+
+def walk(
+    directory: str,
+    path_filter: Optional[PathFilter] = None,
+    workers: int = SCAN_WALK_WORKERS
+) -> List[Tuple[str, str]]:
+    """
+    Collect the files of a directory that should be scanned.
+
+    Args:
+        directory: Root of the tree
+        path_filter: What to skip; a PathFilter with the configured defaults if None
+        workers: Threads walking top-level subdirectories at once; listing
+            directories releases the GIL, so this helps most on slow or
+            networked file systems
+
+    Returns:
+        List of (absolute path, relative path) pairs, in the same order for
+        any number of workers
+    """
+    path_filter = path_filter if path_filter is not None else PathFilter()
+    rules: Tuple[IgnoreRule, ...] = ()
+    if path_filter.respect_gitignore:
+        rules = path_filter.add_ignore_file(rules, "", _read_text(os.path.join(directory, ".git", "info", "exclude")))
+
+    if workers <= 1:
+        paths = []
+        _walk_tree(directory, "", rules, path_filter, paths)
+        return paths
+
+    paths = []
+    subdirectories = []
+    _walk_tree(directory, "", rules, path_filter, paths, subdirectories)
+
+    def walk_subdirectory(subdirectory: Tuple[str, str, tuple]) -> List[Tuple[str, str]]:
+        subtree = []
+        _walk_tree(*subdirectory, path_filter, subtree)
+        return subtree
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="walk") as executor:
+        for subtree in executor.map(walk_subdirectory, subdirectories):
+            paths.extend(subtree)
+    return paths
+
+
+def filter_archive(
+    relative_paths: List[str],
+    ignore_files: Dict[str, str],
+    path_filter: Optional[PathFilter] = None
+) -> List[bool]:
+    """
+    Apply a PathFilter to the file paths of an archive.
+
+    Args:
+        relative_paths: Sanitized member paths
+        ignore_files: Directory -> content of the .gitignore found in it ("" for the root)
+        path_filter: What to skip; a PathFilter with the configured defaults if None
+
+    Returns:
+        Whether each path is scanned
+    """
+    path_filter = path_filter if path_filter is not None else PathFilter()
+    # directory -> rules in effect inside it, or None if it is skipped
+    directories: Dict[str, Optional[tuple]] = {"": path_filter.add_ignore_file((), "", ignore_files.get(""))}
+
+    def rules_in(directory: str) -> Optional[tuple]:
+        if directory in directories:
+            return directories[directory]
+        parent, _, name = directory.rpartition("/")
+        rules = rules_in(parent)
+        if rules is not None:
+            if path_filter.skips_directory(name, directory, rules):
+                rules = None
+            else:
+                rules = path_filter.add_ignore_file(rules, directory, ignore_files.get(directory))
+        directories[directory] = rules
+        return rules
+
+    accepted = []
+    for relative_path in relative_paths:
+        directory, _, name = relative_path.rpartition("/")
+        rules = rules_in(directory)
+        accepted.append(rules is not None and path_filter.accepts_file(name, relative_path, rules))
+    return accepted
@@ -0,0 +1 @@
+"""Benchmarks for LegacyMap on synthetic repositories."""
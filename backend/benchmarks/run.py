@@ -0,0 +1,267 @@
+"""
+Benchmark LegacyMap on synthetic Java repositories.
+
+Run from the backend directory, e.g.:
+
+    python -m benchmarks.run --files 100,1000,10000 --output results.json
+
+Every size is generated with the same seed, so results of different runs
+can be compared for regressions.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Peak RSS is not reported on platforms without the resource module
+    resource = None
+
+from app.scanner import CodeScanner, SCAN_WORKERS
+from app.result_cache import FileResultCache
+
+from .synthetic_repo import generate_java_repo, write_zip
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size so far of this process and of its worker processes."""
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return round(peak * scale / (1024 * 1024), 1)
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> List[float]:
+    """Call func repeat times and return the duration of each call."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def throughput(seconds: float, scanner: CodeScanner) -> Dict[str, Any]:
+    files = scanner.counts.get("files", 0)
+    size = scanner.counts.get("bytes", 0)
+    return {
+        "seconds": round(seconds, 4),
+        "files": files,
+        "bytes": size,
+        "files_per_second": round(files / seconds, 1) if seconds else None,
+        "mb_per_second": round(size / seconds / (1024 * 1024), 3) if seconds else None,
+        "phases": {phase: round(value, 4) for phase, value in scanner.timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_scan_directory(root: str, workers: int) -> Dict[str, Any]:
+    scanner = CodeScanner(max_workers=workers)
+    started = time.perf_counter()
+    scanner.scan_directory(root)
+    return throughput(time.perf_counter() - started, scanner)
+
+
+def bench_analyze_zip(zip_path: str, workers: int) -> Tuple[Dict[str, Any], CodeScanner, Dict[str, Any]]:
+    scanner = CodeScanner(max_workers=workers)
+    started = time.perf_counter()
+    results = scanner.analyze_zip(zip_path)
+    report = throughput(time.perf_counter() - started, scanner)
+    return report, scanner, results
+
+
+def bench_function_details(
+    scanner: CodeScanner,
+    results: Dict[str, Any],
+    samples: int,
+    rng: random.Random
+) -> Dict[str, Any]:
+    functions = [f for f in results["functions"] if f["type"] == "function"]
+    targets = [rng.choice(functions) for _ in range(samples)] if functions else []
+    files = results["files"]
+
+    latencies = []
+    for target in targets:
+        started = time.perf_counter()
+        scanner.get_function_details(files, target["file"], target["name"], scanner.symbol_index)
+        latencies.append(time.perf_counter() - started)
+    return latency_stats(latencies)
+
+
+def bench_http(
+    zip_path: str,
+    samples: int,
+    rng: random.Random,
+    result_cache_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Upload, poll and query the API in-process through the FastAPI test client.
+
+    Uploads are scanned with a new result cache at result_cache_path, or
+    without one if it is None, never with the shared cache earlier runs filled.
+    """
+    from fastapi.testclient import TestClient
+    from app import main as api
+
+    api.result_cache = FileResultCache(result_cache_path) if result_cache_path else None
+    client = TestClient(api.app)
+    report: Dict[str, Any] = {}
+
+    started = time.perf_counter()
+    with open(zip_path, 'rb') as f:
+        job = client.post("/upload-analyze", files={"file": ("bench.zip", f, "application/zip")}).json()
+    while job["status"] not in ("completed", "failed", "cancelled"):
+        time.sleep(0.01)
+        job = client.get(f"/jobs/{job['job_id']}").json()
+    report["upload_analyze"] = {"seconds": round(time.perf_counter() - started, 4), "status": job["status"]}
+    if job["status"] != "completed":
+        report["error"] = job.get("error")
+        return report
+    repo_id = job["repo_id"]
+
+    analysis = client.get(f"/analysis/{repo_id}").json()
+    functions = [f for f in analysis["functions"] if f["type"] == "function"]
+    paths = [file_data["path"] for file_data in analysis["files"]]
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    def function_details():
+        function = rng.choice(functions)
+        return client.get(f"/function-details/{repo_id}/{function['file']}/{function['name']}")
+
+    requests = {
+        "analysis_rows": lambda: client.get(f"/analysis/{repo_id}"),
+        "analysis_columnar": lambda: client.get(f"/analysis/{repo_id}", params={"format": "columnar"}),
+        "analysis_page": lambda: client.get(
+            f"/analysis/{repo_id}", params={"sort": "risk_score", "limit": 50, "sections": "files"}
+        ),
+        "function_details": function_details,
+        "neighborhood": lambda: client.get(
+            f"/graph/{repo_id}/neighborhood", params={"file": rng.choice(paths), "depth": 2}
+        ),
+    }
+    # Whole-analysis responses are large; sample them less often
+    whole_samples = max(1, samples // 10)
+    for name, request in requests.items():
+        count = whole_samples if name in ("analysis_rows", "analysis_columnar") else samples
+        report[name] = latency_stats(measure(request, count))
+
+    client.delete(f"/analysis/{repo_id}")
+    return report
+
+
+def run_size(args: argparse.Namespace, files: int) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="legacymap-bench-")
+    try:
+        root = os.path.join(work_dir, "repo")
+        started = time.perf_counter()
+        repo = generate_java_repo(
+            root,
+            files=files,
+            package_depth=args.package_depth,
+            packages_per_level=args.packages_per_level,
+            import_fan_out=args.fan_out,
+            methods_per_class=args.methods,
+            line_length=args.line_length,
+            seed=args.seed,
+        )
+        zip_path = os.path.join(work_dir, "repo.zip")
+        write_zip(root, zip_path)
+        repo["generate_seconds"] = round(time.perf_counter() - started, 3)
+
+        run = {"repo": repo}
+        print(f"[{files} files] scan_directory", file=sys.stderr)
+        run["scan_directory"] = bench_scan_directory(root, args.workers)
+        print(f"[{files} files] analyze_zip", file=sys.stderr)
+        run["analyze_zip"], scanner, results = bench_analyze_zip(zip_path, args.workers)
+        print(f"[{files} files] get_function_details", file=sys.stderr)
+        run["get_function_details"] = bench_function_details(scanner, results, args.samples, rng)
+        del scanner, results
+        if not args.skip_http:
+            print(f"[{files} files] http", file=sys.stderr)
+            result_cache_path = os.path.join(work_dir, "results.sqlite3") if args.result_cache else None
+            run["http"] = bench_http(zip_path, args.samples, rng, result_cache_path)
+        return run
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", default="100,1000,10000",
+                        help="Comma-separated repository sizes in files (default: 100,1000,10000)")
+    parser.add_argument("--package-depth", type=int, default=3)
+    parser.add_argument("--packages-per-level", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=5, help="Imports per class")
+    parser.add_argument("--methods", type=int, default=8, help="Methods per class")
+    parser.add_argument("--line-length", type=int, default=80)
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="Scanner worker processes")
+    parser.add_argument("--samples", type=int, default=200, help="Requests per latency benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-http", action="store_true", help="Skip the HTTP endpoint benchmarks")
+    parser.add_argument("--result-cache", action="store_true",
+                        help="Scan HTTP uploads with a per-file result cache (new and empty for every size)")
+    parser.add_argument("--output", help="Write results to this JSON file instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": numpy_version,
+        },
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "runs": [run_size(args, int(size)) for size in args.files.split(",") if size.strip()],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Synthetic Java repositories for benchmarking LegacyMap."""
+
+import os
+import random
+import zipfile
+from typing import Dict, List, Any
+
+
+def _package_names(depth: int, packages_per_level: int) -> List[str]:
+    """All leaf packages of a tree ``depth`` levels below com.bench."""
+    packages = ["com.bench"]
+    for level in range(depth):
+        packages = [
+            f"{package}.p{level}{i}"
+            for package in packages
+            for i in range(packages_per_level)
+        ]
+    return packages
+
+
+def _pad(line: str, line_length: int) -> str:
+    """Pad a statement with a trailing comment up to roughly line_length characters."""
+    missing = line_length - len(line) - 4
+    if missing <= 0:
+        return line
+    return f"{line} // {'x' * missing}"
+
+
+def generate_java_repo(
+    root: str,
+    files: int = 1000,
+    package_depth: int = 3,
+    packages_per_level: int = 4,
+    import_fan_out: int = 5,
+    methods_per_class: int = 8,
+    line_length: int = 80,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Write a synthetic Java repository.
+
+    Classes are spread evenly over the leaf packages. Each class imports
+    ``import_fan_out`` random other classes, and each method calls a method
+    of an imported class, so the dependency graph, call sites and call graph
+    all grow with the repository.
+
+    Args:
+        root: Directory to write into; created if missing
+        files: Number of .java files
+        package_depth: Levels of packages below com.bench
+        packages_per_level: Sub-packages of each package
+        import_fan_out: Imports per class
+        methods_per_class: Methods per class
+        line_length: Approximate length of every line
+        seed: Random seed; the same arguments always give the same repository
+
+    Returns:
+        Parameters used, plus the number of bytes and methods written
+    """
+    rng = random.Random(seed)
+    packages = _package_names(package_depth, packages_per_level)
+    classes = [(packages[i % len(packages)], f"C{i}") for i in range(files)]
+
+    total_bytes = 0
+    for i, (package, class_name) in enumerate(classes):
+        imported = rng.sample(range(files), min(import_fan_out, files - 1)) if files > 1 else []
+        imported = [j for j in imported if j != i]
+
+        lines = [f"package {package};", ""]
+        for j in imported:
+            lines.append(f"import {classes[j][0]}.{classes[j][1]};")
+        lines += ["", f"public class {class_name} {{"]
+        for j in imported:
+            lines.append(_pad(f"    private {classes[j][1]} f{j} = new {classes[j][1]}();", line_length))
+        for m in range(methods_per_class):
+            lines.append("")
+            lines.append(f"    public int m{m}(int value) {{")
+            lines.append(_pad(f"        int result = value * {m + 1};", line_length))
+            if imported:
+                j = imported[m % len(imported)]
+                lines.append(_pad(f"        result += f{j}.m{rng.randrange(methods_per_class)}(result);", line_length))
+            if m > 0:
+                lines.append(_pad(f"        result += m{m - 1}(result);", line_length))
+            lines.append(_pad(f'        String text = "{class_name}.m{m}";', line_length))
+            lines.append("        return result + text.length();")
+            lines.append("    }")
+        lines.append("}")
+
+        directory = os.path.join(root, "src", *package.split("."))
+        os.makedirs(directory, exist_ok=True)
+        source = "\n".join(lines) + "\n"
+        with open(os.path.join(directory, f"{class_name}.java"), 'w', encoding='utf-8') as f:
+            f.write(source)
+        total_bytes += len(source.encode('utf-8'))
+
+    return {
+        "files": files,
+        "package_depth": package_depth,
+        "packages_per_level": packages_per_level,
+        "import_fan_out": import_fan_out,
+        "methods_per_class": methods_per_class,
+        "line_length": line_length,
+        "seed": seed,
+        "packages": len(packages),
+        "bytes": total_bytes,
+        "methods": files * methods_per_class,
+    }
+
+
+def write_zip(root: str, zip_path: str):
+    """Archive a generated repository the way users upload one."""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                zip_ref.write(path, os.path.relpath(path, root))
@@ -0,0 +1,187 @@
+"""SummaryService against a stub Ollama served through httpx.MockTransport."""
+
+import json
+import asyncio
+
+import httpx
+
+from app.ai_summary import SummaryService
+
+
+def make_analysis(name: str = "Main") -> dict:
+    return {
+        "summary": {"total_files": 1, "total_functions": 1, "total_loc": 10},
+        "files": [{"path": f"{name}.java", "risk_score": 1.0}],
+        "functions": [{"name": name, "type": "class"}],
+    }
+
+
+class StubOllama:
+    """
+    Answers /api/generate like Ollama, one NDJSON line per token.
+
+    Every response waits for ``release`` before sending its last token, so
+    tests can look at generations while they are still running.
+    """
+
+    def __init__(self, tokens=("Hello", ", ", "world"), status_code: int = 200, error: str = None):
+        self.tokens = list(tokens)
+        self.status_code = status_code
+        self.error = error
+        self.release = asyncio.Event()
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        assert payload["stream"] is True
+        self.prompts.append(payload["prompt"])
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, text="model not found")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return httpx.Response(200, content=self.lines())
+
+    async def lines(self):
+        for token in self.tokens[:-1]:
+            yield (json.dumps({"response": token, "done": False}) + "\n").encode()
+        await self.release.wait()
+        # The client stops reading after the last line, so count the request as done here
+        self.in_flight -= 1
+        if self.error:
+            yield (json.dumps({"error": self.error}) + "\n").encode()
+            return
+        yield (json.dumps({"response": self.tokens[-1], "done": True}) + "\n").encode()
+
+
+def make_service(stub: StubOllama, **kwargs) -> SummaryService:
+    service = SummaryService(api_url="http://ollama.test/api/generate", model="stub", **kwargs)
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(stub.handler))
+    return service
+
+
+async def settle():
+    """Let started generations run until they wait on the stub."""
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_streams_tokens_as_they_are_generated():
+    async def scenario():
+        stub = StubOllama()
+        service = make_service(stub)
+        generation = service.summarize("repo", make_analysis())
+        stream = generation.stream()
+
+        # The first tokens arrive while the upstream response is still open
+        assert await stream.__anext__() == "Hello"
+        assert await stream.__anext__() == ", "
+        assert not generation.done
+
+        stub.release.set()
+        assert [chunk async for chunk in stream] == ["world"]
+        assert await generation.text() == "Hello, world"
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_requests_for_a_repo_share_one_generation():
+    async def scenario():
+        stub = StubOllama()
+        service = make_service(stub)
+        first = service.summarize("repo", make_analysis())
+        await settle()
+        second = service.summarize("repo", make_analysis())
+        assert second is first
+
+        stub.release.set()
+        texts = await asyncio.gather(first.text(), second.text())
+        assert texts == ["Hello, world", "Hello, world"]
+        assert len(stub.prompts) == 1
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_finished_summaries_are_cached_by_prompt():
+    async def scenario():
+        stub = StubOllama()
+        stub.release.set()
+        service = make_service(stub)
+        assert await service.summarize("repo", make_analysis()).text() == "Hello, world"
+
+        # Same prompt under another repo_id: served from the cache
+        cached = service.summarize("other", make_analysis())
+        assert cached.done
+        assert await cached.text() == "Hello, world"
+        assert len(stub.prompts) == 1
+
+        # A different analysis is a different prompt
+        await service.summarize("third", make_analysis("Other")).text()
+        assert len(stub.prompts) == 2
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_generations_are_limited_to_max_concurrency():
+    async def scenario():
+        stub = StubOllama()
+        service = make_service(stub, max_concurrency=2)
+        generations = [service.summarize(f"repo{i}", make_analysis(f"C{i}")) for i in range(5)]
+        await settle()
+        assert stub.in_flight == 2
+        assert len(stub.prompts) == 2
+
+        stub.release.set()
+        texts = await asyncio.gather(*(generation.text() for generation in generations))
+        assert texts == ["Hello, world"] * 5
+        assert stub.max_in_flight == 2
+        assert len(stub.prompts) == 5
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_upstream_errors_are_reported_and_not_cached():
+    async def scenario():
+        stub = StubOllama(status_code=500)
+        service = make_service(stub)
+        text = await service.summarize("repo", make_analysis()).text()
+        assert text == "Error from Local AI: 500 - model not found"
+
+        # The failure is not cached: the next request asks Ollama again
+        await service.summarize("repo", make_analysis()).text()
+        assert len(stub.prompts) == 2
+        assert not service.in_flight
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_errors_in_the_token_stream_end_the_summary():
+    async def scenario():
+        stub = StubOllama(error="out of memory")
+        stub.release.set()
+        service = make_service(stub)
+        text = await service.summarize("repo", make_analysis()).text()
+        assert text.endswith("Error from Local AI: out of memory")
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_ollama():
+    async def scenario():
+        def refuse(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("connection refused", request=request)
+
+        service = SummaryService(api_url="http://ollama.test/api/generate", model="stub")
+        service.client = httpx.AsyncClient(transport=httpx.MockTransport(refuse))
+        text = await service.summarize("repo", make_analysis()).text()
+        assert text.startswith("Error: Could not connect to Ollama")
+        await service.close()
+
+    asyncio.run(scenario())
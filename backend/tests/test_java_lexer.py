@@ -0,0 +1,46 @@
+"""Declarations and call sites found by the Java lexer."""
+
+from app.java_lexer import lex_java
+
+
+def test_qualified_annotations_are_not_calls():
+    source = lex_java(
+        "class A {\n"
+        "    @javax.annotation.Generated(\"x\")\n"
+        "    @Override\n"
+        "    @SuppressWarnings(\"unchecked\")\n"
+        "    void run() { helper(); }\n"
+        "}\n"
+    )
+    assert source.call_sites == {"helper": [5]}
+    assert ("run", "function", 5) in source.declarations
+
+
+def test_annotation_type_declaration():
+    source = lex_java("@interface Marker {\n    String value();\n}\n")
+    assert source.declarations == [("Marker", "class", 1), ("value", "function", 2)]
+
+
+def test_compact_record_constructor_is_a_declaration():
+    source = lex_java(
+        "record R(int x) implements Comparable<R> {\n"
+        "    R {\n"
+        "        check(x);\n"
+        "    }\n"
+        "    static R of(int x) { return new R(x); }\n"
+        "}\n"
+    )
+    assert source.declarations == [("R", "class", 1), ("R", "function", 2), ("of", "function", 5)]
+    # Only the constructor call in of() calls R
+    assert source.call_sites == {"check": [3], "R": [5]}
+    assert source.spans["R"] == {"start": 2, "end": 5, "calls": ["check"]}
+
+
+def test_methods_named_like_the_record_outside_it_are_calls():
+    source = lex_java(
+        "record R(int x) {}\n"
+        "class B {\n"
+        "    void run() { R(); }\n"
+        "}\n"
+    )
+    assert source.call_sites == {"R": [3]}
@@ -56,11 +56,31 @@ export function Dashboard({ data, onReset }: DashboardProps) {
     const handleGenerateSummary = async () => {
         setIsGeneratingSummary(true)
         try {
-            const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/generate-summary/${data.repo_id}`, {
+            const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/generate-summary/${data.repo_id}?stream=true`, {
                 method: 'POST',
             })
-            const result = await response.json()
-            setAiSummary(result.summary)
+            if (!response.ok || !response.body) {
+                throw new Error(`Summary request failed: ${response.status}`)
+            }
+
+            // Show the summary as it is generated; events are "data: {token}" lines
+            const reader = response.body.getReader()
+            const decoder = new TextDecoder()
+            let buffer = ""
+            let summary = ""
+            while (true) {
+                const { done, value } = await reader.read()
+                if (done) break
+                buffer += decoder.decode(value, { stream: true })
+                const events = buffer.split("\n\n")
+                buffer = events.pop() ?? ""
+                for (const event of events) {
+                    const dataLine = event.split("\n").find((line) => line.startsWith("data: "))
+                    if (!dataLine || event.startsWith("event: done")) continue
+                    summary += JSON.parse(dataLine.slice(6)).token
+                    setAiSummary(summary)
+                }
+            }
         } catch (error) {
             console.error("Error generating summary:", error)
             setAiSummary("Failed to generate summary. Please try again.")
@@ -72,7 +72,27 @@ export function UploadComponent({ onAnalysisComplete }: UploadComponentProps) {
                 throw new Error(errorData.detail || "Analysis failed")
             }
 
-            const data = await response.json()
+            // Analysis runs in the background; poll the job until it finishes
+            let job = await response.json()
+            while (job.status === "queued" || job.status === "running") {
+                await new Promise((resolve) => setTimeout(resolve, 1000))
+                const jobResponse = await fetch(`${backendUrl}/jobs/${job.job_id}`)
+                if (!jobResponse.ok) {
+                    throw new Error("Lost track of the analysis job")
+                }
+                job = await jobResponse.json()
+            }
+
+            if (job.status !== "completed") {
+                throw new Error(job.error || `Analysis ${job.status}`)
+            }
+
+            const analysisResponse = await fetch(`${backendUrl}/analysis/${job.repo_id}`)
+            if (!analysisResponse.ok) {
+                throw new Error("Analysis results not found")
+            }
+
+            const data = await analysisResponse.json()
             onAnalysisComplete(data)
         } catch (err: any) {
             console.error("Upload error:", err)